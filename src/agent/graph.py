@@ -6,8 +6,9 @@ from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage
 from langgraph.constants import END
 from langgraph.graph.state import CompiledStateGraph, StateGraph
 
-from src.agent.prompts import failure_no_results_message
+from src.agent.prompts import failure_no_results_message, llm_failure_message
 from src.agent.state import AgentState
+from src.config.config import DEFAULT_AGENT_MODEL
 from src.databases.qdrant.search_embeddings import get_candidates, fetch_similar_qa_pairs
 from src.llm.llm_provider import llm_provider
 from src.tools.graph_context import enrich_candidates
@@ -16,12 +17,19 @@ from src.tools.tools import generate_sparql, validate_results
 from src.utils.extract_previous_queries import extract_previous_queries
 from src.utils.extract_qids import extract_all_qids
 from src.utils.format_candidates_clean import format_candidates_clean
-from src.wikidata.api import get_wikidata_labels
+from src.utils.timing import stopwatch, timed
+from src.wikidata.labels import fetch_labels
 
 tools = [generate_sparql, validate_results]
 tools_by_name = {tool.name: tool for tool in tools}
-llm = llm_provider.get_model("nvidia/nemotron-3-nano-30b-a3b:free")
-llm_with_tools = llm.bind_tools(tools)
+_llms_with_tools = {}
+
+
+def get_llm_with_tools(model_identifier: str = DEFAULT_AGENT_MODEL):
+    """Returns the tool-bound agent LLM for a model, binding the tools only once per model."""
+    if model_identifier not in _llms_with_tools:
+        _llms_with_tools[model_identifier] = llm_provider.get_model(model_identifier).bind_tools(tools)
+    return _llms_with_tools[model_identifier]
 
 
 async def llm_node(state: AgentState) -> dict[str, list[BaseMessage]]:
@@ -30,14 +38,17 @@ async def llm_node(state: AgentState) -> dict[str, list[BaseMessage]]:
     Your primary task is to use the provided tools to answer the user's question.
     **IMPORTANT**: Do not translate the question keep the original language."""
 
+    llm_with_tools = get_llm_with_tools(state.get("model") or DEFAULT_AGENT_MODEL)
+    timings = {}
+
     try:
-        response = await llm_with_tools.ainvoke(
+        response = await timed(llm_with_tools.ainvoke(
             [SystemMessage(content=content)] + state["messages"]
-        )
-        return {"messages": [response]}
+        ), timings, "llm_ms")
+        return {"messages": [response], "timings": timings}
     except Exception as e:
         print(f"ERROR: An exception occurred in the llm_node: {e}")
-        return {"messages": [AIMessage(content=f"LLM call failed: {e}")]}
+        return {"messages": [AIMessage(content=llm_failure_message.format(error=e))], "timings": timings}
 
 
 async def retrieval_node(state: AgentState):
@@ -49,28 +60,30 @@ async def retrieval_node(state: AgentState):
 
     ner_keywords = state.get("ner_keywords", [])
     current_lang = state.get("language", "en")
+    timings = {"ner_ms": 0.0, "qdrant_ms": 0.0, "wikidata_search_ms": 0.0}
 
     if not ner_keywords or force_refresh:
         try:
-            ner_result = await get_ner_result(question)
+            ner_result = await timed(get_ner_result(question), timings, "ner_ms")
             ner_keywords = [k.model_dump() for k in ner_result.keywords]
             current_lang = ner_result.lang
         except Exception as e:
             print(f"NER Extraction Failed: {e}")
 
-    candidates_map = await get_candidates(ner_keywords, lang=current_lang)
+    candidates_map = await get_candidates(ner_keywords, lang=current_lang, timings=timings)
 
-    await enrich_candidates(candidates_map)
+    await timed(enrich_candidates(candidates_map, current_lang), timings, "enrich_ms")
 
     candidates_str = format_candidates_clean(candidates_map)
 
-    examples = await fetch_similar_qa_pairs(question, current_lang)
+    examples = await timed(fetch_similar_qa_pairs(question, current_lang), timings, "examples_ms")
 
     return {
         "ner_keywords": ner_keywords,
         "language": current_lang,
         "candidates": candidates_str,
-        "examples": examples
+        "examples": examples,
+        "timings": timings
     }
 
 
@@ -98,6 +111,7 @@ async def tool_node(state: AgentState):
         args["candidates"] = state.get("candidates", "")
         args["examples"] = state.get("examples", "")
         args["ner_keywords"] = state.get("ner_keywords", [])
+        args["model"] = state.get("model") or DEFAULT_AGENT_MODEL
 
         try:
             observation = await tool.ainvoke(args)
@@ -112,6 +126,9 @@ async def tool_node(state: AgentState):
                     failed_query=observation["sparql"],
                     previous_queries="\n".join(previous_queries)
                 )
+                if observation.get("error"):
+                    # Syntax errors and cost-guard rejections tell the LLM what to change
+                    content += f"\nReason the query was not run:\n{observation['error']}\n"
                 result_messages.append(ToolMessage(content=content, tool_call_id=tool_call["id"]))
             else:
                 result_messages.append(ToolMessage(content=str(observation), tool_call_id=tool_call["id"]))
@@ -134,7 +151,37 @@ async def validation_node(state: AgentState):
     last_message = state["messages"][-1]
     original_question = state["original_question"]
     raw_content = last_message.content
+    timings = {}
+
+    with stopwatch(timings, "validate_ms"):
+        is_valid, feedback_text = await _validate_last_results(
+            original_question, raw_content, state.get("language", "en")
+        )
+
+    if is_valid:
+        return {
+            "messages": [
+                SystemMessage(
+                    content="The SPARQL results have been validated and appear correct. Please formulate your final answer to the user based on these results."
+                )
+            ],
+            "timings": timings
+        }
+    else:
+        content = (
+            f"The previous query returned results, but the automated validator determined "
+            f"they do not correctly answer the question: '{original_question}'.\n"
+            f"Validator Feedback: {feedback_text}\n"
+            f"Please analyze the previous query and results, and generate a CORRECTED SPARQL query."
+        )
+        return {
+            "messages": [SystemMessage(content=content)],
+            "timings": timings
+        }
 
+
+async def _validate_last_results(original_question: str, raw_content: str, language: str = "en") -> tuple[bool, str]:
+    """Looks up labels for the IDs in the results and asks the validator LLM about them."""
     try:
         parsed_content = ast.literal_eval(raw_content)
         if isinstance(parsed_content, dict) and "results" in parsed_content:
@@ -149,20 +196,17 @@ async def validation_node(state: AgentState):
 
     if ids_to_lookup:
         try:
-            labels_map = get_wikidata_labels(ids_to_lookup)
+            # Question language and English in one request
+            labels_map = await fetch_labels(ids_to_lookup, [language, "en"])
             if labels_map:
                 enriched_context = "\n\n**Entity Definitions (Context for Validator):**\n"
-                for qid, info_data in labels_map.items():
-                    if not info_data: continue
-                    first_item = info_data[0] if isinstance(info_data, list) else info_data
-                    if isinstance(first_item, dict):
-                        label = first_item.get('label', 'Unknown')
-                        desc = first_item.get('description', 'No description')
-                        enriched_context += f"- {qid}: '{label}' ({desc})\n"
-                    elif isinstance(first_item, str):
-                        enriched_context += f"- {qid}: '{first_item}'\n"
+                for qid, labels in labels_map.items():
+                    label = labels.get(language) or labels.get("en")
+                    english = labels.get("en")
+                    if english and english != label:
+                        enriched_context += f"- {qid}: '{label}' (en: '{english}')\n"
                     else:
-                        enriched_context += f"- {qid}: {str(first_item)}\n"
+                        enriched_context += f"- {qid}: '{label}'\n"
             else:
                 enriched_context = "\n(No labels found for these IDs in Wikidata)"
         except Exception as e:
@@ -192,24 +236,7 @@ async def validation_node(state: AgentState):
             is_valid = "true" in val_str or "yes" in val_str
             feedback_text = str(validation_output)
 
-    if is_valid:
-        return {
-            "messages": [
-                SystemMessage(
-                    content="The SPARQL results have been validated and appear correct. Please formulate your final answer to the user based on these results."
-                )
-            ]
-        }
-    else:
-        content = (
-            f"The previous query returned results, but the automated validator determined "
-            f"they do not correctly answer the question: '{original_question}'.\n"
-            f"Validator Feedback: {feedback_text}\n"
-            f"Please analyze the previous query and results, and generate a CORRECTED SPARQL query."
-        )
-        return {
-            "messages": [SystemMessage(content=content)]
-        }
+    return is_valid, feedback_text
 
 
 def should_continue(state: AgentState) -> str:
@@ -17,6 +17,9 @@ User task:
 {user_task}
 """
 
+# Content of the AIMessage that llm_node returns when the LLM call raised
+llm_failure_message = "LLM call failed: {error}"
+
 failure_no_results_message = """
 The previous SPARQL query for the user task "{user_task}" returned no results.
 
@@ -8,8 +8,10 @@ class AgentState(TypedDict):
     attempts: int
     original_question: str
     language: str
+    model: str
     ner_keywords: List[dict]
     candidates: str
     schema_context: str
     examples: str
+    timings: dict[str, float]
     log_data: Annotated[list[dict[str, Any]], lambda x, y: x + y]
\ No newline at end of file
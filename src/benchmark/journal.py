@@ -0,0 +1,100 @@
+import csv
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Any, Set
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class CompletionJournal:
+    """
+    Append-only JSONL journal of finished benchmark questions.
+
+    Every line records one question outcome: question id, question text, status,
+    attempt count and wall-clock time. The last record of a question wins, so a
+    question that failed and later succeeded counts as done. Lines are fsynced
+    after the question's CSV rows, which means a question is only marked done
+    once its rows are on disk.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash can leave a truncated last line behind
+                    continue
+                self.entries[str(entry["question_id"])] = entry
+
+    def completed_ids(self) -> Set[str]:
+        return {qid for qid, entry in self.entries.items() if entry.get("status") == STATUS_DONE}
+
+    def failed_entries(self) -> Dict[str, Dict[str, Any]]:
+        return {qid: entry for qid, entry in self.entries.items() if entry.get("status") == STATUS_FAILED}
+
+    def record(self, question_id: str, question: str, status: str, attempts: int, elapsed: float,
+               error: str = ""):
+        entry = {
+            "question_id": str(question_id),
+            "question": question,
+            "status": status,
+            "attempts": attempts,
+            "time": round(elapsed, 2),
+            "error": error,
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.entries[entry["question_id"]] = entry
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def journal_path_for(csv_file_name: str | Path) -> Path:
+    csv_path = Path(csv_file_name)
+    return csv_path.with_name(f"{csv_path.stem}.journal.jsonl")
+
+
+def drop_failed_rows(csv_file_name: str | Path, journal: CompletionJournal) -> int:
+    """
+    Removes the rows of questions whose last journal status is failed, so that
+    retrying them does not leave a second group of attempts for the same question.
+    Returns the number of rows removed.
+    """
+    csv_path = Path(csv_file_name)
+    failed_questions = {entry["question"] for entry in journal.failed_entries().values()}
+    if not failed_questions or not csv_path.exists():
+        return 0
+
+    with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return 0
+
+    header, body = rows[0], rows[1:]
+    question_col = header.index("original_question") if "original_question" in header else 0
+    kept = [row for row in body if not row or row[question_col] not in failed_questions]
+
+    removed = len(body) - len(kept)
+    if removed:
+        tmp_path = csv_path.with_suffix(csv_path.suffix + ".tmp")
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows([header] + kept)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, csv_path)
+    return removed
@@ -0,0 +1,108 @@
+import asyncio
+import itertools
+import os
+from pathlib import Path
+from typing import List
+
+from src.benchmark.runner import run_benchmark_file
+from src.benchmark.shards import ShardPool
+from src.config.config import BenchmarkConfig
+from src.dataset.qald_10 import load_qald_json, QALD_JSON_PATH
+from src.utils.outputs_analysis import AnalysisPipeline
+
+DEFAULT_OUTPUT_DIR = "../results/benchmark/with_neighbors"
+
+
+def model_slug(model_identifier: str) -> str:
+    """
+    Turns a model identifier into the name used in result file names,
+    e.g. 'nvidia/nemotron-3-nano-30b-a3b:free' -> 'nemotron-3-nano-30b-a3b'.
+    Underscores are replaced because the dashboard splits file names on them.
+    """
+    name = model_identifier.rsplit("/", 1)[-1]
+    name = name.split(":", 1)[0]
+    return name.replace("_", "-")
+
+
+def raw_csv_path(output_dir: str | Path, language: str, model_identifier: str) -> Path:
+    return Path(output_dir) / f"sparql_outputs_{language}_{model_slug(model_identifier)}_raw.csv"
+
+
+def processed_csv_path(output_dir: str | Path, language: str, model_identifier: str) -> Path:
+    return Path(output_dir) / "processed" / f"{language}_{model_slug(model_identifier)}.csv"
+
+
+async def run_matrix(
+        languages: List[str],
+        models: List[str],
+        output_dir: str = DEFAULT_OUTPUT_DIR,
+        concurrency: int = 1,
+        analyze: bool = True,
+        shards: int = 1,
+):
+    """
+    Runs every language x model cell in this process.
+
+    The compiled agent, the embedder, the Qdrant client, the aiohttp session and the
+    cached LLM clients are module-level singletons, so they are set up once and shared
+    by all cells. Each cell writes its raw CSV (and journal) to `output_dir`, and, when
+    `analyze` is set, the `AnalysisPipeline` output to `output_dir/processed`, which is
+    the layout `multilingual_benchmark.py` reads.
+
+    With `shards > 1` the questions of each cell are split across that many worker
+    processes (see `ShardPool`); `concurrency` then applies per shard.
+    """
+    for language in languages:
+        BenchmarkConfig.validate_language(language)
+
+    Path(output_dir, "processed").mkdir(parents=True, exist_ok=True)
+
+    benchmark_data = {language: load_qald_json(lang=language) for language in languages}
+
+    shard_pool = None
+    sparql_agent = None
+    if shards > 1:
+        print(f"Starting {shards} shard workers...")
+        shard_pool = ShardPool(shards)
+    else:
+        # Imported here so a sharded parent does not load the embedder it never uses
+        from src.agent.graph import create_sparql_agent
+
+        print("Compiling the SPARQL agent...")
+        sparql_agent = create_sparql_agent()
+
+    try:
+        for language, model in itertools.product(languages, models):
+            await _run_cell(output_dir, language, model, benchmark_data[language], sparql_agent, shard_pool,
+                            concurrency, analyze)
+    finally:
+        if shard_pool:
+            shard_pool.close()
+        else:
+            from src.wikidata.api import sparql_cache, search_cache, in_flight
+            print(sparql_cache.format_stats())
+            print(search_cache.format_stats())
+            print(f"Coalesced {in_flight.stats['shared']} duplicate Wikidata requests "
+                  f"into {in_flight.stats['calls']} calls.")
+
+
+async def _run_cell(output_dir, language, model, items, sparql_agent, shard_pool, concurrency, analyze):
+    raw_path = raw_csv_path(output_dir, language, model)
+    print(f"\n=== Cell: language={language.upper()} model={model} -> {raw_path} ===")
+
+    if shard_pool:
+        await asyncio.to_thread(shard_pool.run_cell, str(raw_path), items, language, model, concurrency)
+    else:
+        await run_benchmark_file(
+            str(raw_path),
+            items,
+            sparql_agent,
+            language=language,
+            concurrency=concurrency,
+            model=model,
+        )
+
+    if analyze and os.path.exists(raw_path):
+        await AnalysisPipeline(str(raw_path), QALD_JSON_PATH, language).arun(
+            str(processed_csv_path(output_dir, language, model))
+        )
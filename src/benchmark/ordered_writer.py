@@ -0,0 +1,50 @@
+import csv
+import os
+from typing import List, Dict, Any, TextIO, Callable, Optional
+
+
+class OrderedCsvWriter:
+    """
+    Writes benchmark rows grouped per question and in dataset order.
+
+    Questions may finish in any order when they run concurrently. Rows of a finished
+    question are held back until every question scheduled before it has been written,
+    so the CSV keeps the "all attempts of one question are adjacent" layout that
+    `gerbil_eval` and `AnalysisPipeline` rely on.
+    """
+
+    def __init__(self, file: TextIO, order: List[int], on_flush: Optional[Callable[[int], None]] = None):
+        self._file = file
+        self._on_flush = on_flush
+        self._writer = csv.writer(file)
+        self._order = list(order)
+        self._position = 0
+        self._pending: Dict[int, List[List[Any]]] = {}
+
+    def writeheader(self, header: List[str]):
+        self._writer.writerow(header)
+        self._file.flush()
+
+    def submit(self, index: int, rows: List[List[Any]]):
+        """Registers the finished rows of a question and flushes everything that is ready."""
+        self._pending[index] = rows
+        self._flush_ready()
+
+    def _flush_ready(self):
+        flushed = []
+        while self._position < len(self._order) and self._order[self._position] in self._pending:
+            index = self._order[self._position]
+            self._writer.writerows(self._pending.pop(index))
+            self._position += 1
+            flushed.append(index)
+        self._file.flush()
+
+        if flushed and self._on_flush:
+            # Rows must be durable before anyone (e.g. the journal) treats them as written
+            os.fsync(self._file.fileno())
+            for index in flushed:
+                self._on_flush(index)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
@@ -0,0 +1,250 @@
+import asyncio
+import csv
+import os
+import time
+from typing import Any, List, Tuple, Optional
+
+from langchain_core.messages import HumanMessage
+from tqdm import tqdm
+
+from src.agent.prompts import sparql_agent_instruction, llm_failure_message
+from src.benchmark.journal import CompletionJournal, journal_path_for, drop_failed_rows, STATUS_DONE, \
+    STATUS_FAILED
+from src.benchmark.ordered_writer import OrderedCsvWriter
+from src.benchmark.usage_report import append_usage, write_usage_summary
+from src.config.config import DEFAULT_AGENT_MODEL
+from src.llm.usage import UsageTracker
+
+CSV_HEADER = [
+    "original_question",
+    "rephrased_question",
+    "ner",
+    "candidates",
+    "examples",
+    "generated_query",
+    "result",
+    "time",
+    "ner_ms",
+    "qdrant_ms",
+    "wikidata_search_ms",
+    "enrich_ms",
+    "examples_ms",
+    "llm_ms",
+    "sparql_exec_ms",
+    "validate_ms"
+]
+
+# Per-node durations reported through the "timings" key of the graph state updates
+TIMING_COLUMNS = ["ner_ms", "qdrant_ms", "wikidata_search_ms", "enrich_ms", "examples_ms", "llm_ms", "validate_ms"]
+
+
+async def collect_question_rows(
+        item: dict[str, Any],
+        agent,
+        language: str,
+        model: str = DEFAULT_AGENT_MODEL,
+) -> Tuple[List[List[Any]], Optional[str], dict[str, Any]]:
+    """
+    Streams the agent's execution and collects one CSV row per tool attempt.
+    Returns the rows, the error message (if the run failed) and the token usage of
+    the question's LLM calls. A run fails when streaming raised, when it produced no
+    attempts, or when its last LLM call failed (llm_node then ends the graph normally),
+    so that resuming retries the question.
+
+    Node timings are attributed to the attempt they belong to: the retrieval pass and
+    LLM call(s) before a tool call, and the validation run right after it.
+    """
+    question = item["question"]
+
+    initial_state = {
+        "messages": [HumanMessage(content=sparql_agent_instruction.format(user_task=question))],
+        "original_question": question,
+        "attempts": 0,
+        "log_data": [],
+        "language": language,
+        "model": model
+    }
+
+    entries = []
+    pending_timings: dict[str, float] = {}
+    error = None
+    last_llm_message = None
+    usage_tracker = UsageTracker()
+    try:
+        async for step in agent.astream(initial_state, config={"callbacks": [usage_tracker]}):
+            for node_name, update in step.items():
+                if not isinstance(update, dict):
+                    continue
+
+                for key, value in (update.get("timings") or {}).items():
+                    pending_timings[key] = pending_timings.get(key, 0.0) + value
+
+                if node_name == "llm" and update.get("messages"):
+                    last_llm_message = update["messages"][-1]
+
+                if node_name == "tool_executor":
+                    for log_entry in update.get("log_data", []):
+                        if log_entry:
+                            entries.append({**log_entry, **_format_timings(pending_timings)})
+                            pending_timings = {}
+
+                elif node_name == "validator" and entries:
+                    entries[-1].update(_format_timings(pending_timings))
+                    pending_timings = {}
+
+    except Exception as e:
+        print(f"\nCaught a streaming error for question '{question}': {e}")
+        error = str(e)
+        entries.append({"original_question": question, "result": f"STREAMING FAILED: {e}"})
+
+    llm_failure_prefix = llm_failure_message.format(error="")
+    if error is None and last_llm_message is not None and str(last_llm_message.content).startswith(llm_failure_prefix):
+        error = str(last_llm_message.content)
+        entries.append({"original_question": question, "result": f"LLM FAILED: {error[len(llm_failure_prefix):]}"})
+    elif error is None and not entries:
+        error = "The agent finished without running a query."
+        entries.append({"original_question": question, "result": f"NO ATTEMPTS: {error}"})
+
+    rows = [[entry.get(h, "") for h in CSV_HEADER] for entry in entries]
+    return rows, error, usage_tracker.summary()
+
+
+def _format_timings(timings: dict[str, float]) -> dict[str, str]:
+    return {key: f"{value:.1f}" for key, value in timings.items() if key in TIMING_COLUMNS}
+
+
+def upgrade_csv_header(csv_file_name: str):
+    """
+    Rewrites an existing CSV whose header is an older subset of CSV_HEADER, so that
+    rows appended by this version line up with the header.
+    """
+    with open(csv_file_name, 'r', newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    if not rows or rows[0] == CSV_HEADER or not set(rows[0]) <= set(CSV_HEADER):
+        return
+
+    old_header = rows[0]
+    upgraded = [CSV_HEADER]
+    for row in rows[1:]:
+        values = dict(zip(old_header, row))
+        upgraded.append([values.get(h, "") for h in CSV_HEADER])
+
+    tmp_path = f"{csv_file_name}.tmp"
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(upgraded)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, csv_file_name)
+    print(f"Upgraded the header of '{csv_file_name}' to the current CSV layout.")
+
+
+def question_id(index: int, item: dict[str, Any]) -> str:
+    return str(item.get("id", index))
+
+
+async def run_questions(
+        items: List[dict[str, Any]],
+        indices: List[int],
+        agent,
+        writer: OrderedCsvWriter,
+        language: str,
+        concurrency: int = 1,
+        outcomes: Optional[dict[int, dict[str, Any]]] = None,
+        model: str = DEFAULT_AGENT_MODEL,
+):
+    """
+    Runs the agent over `items[i] for i in indices` with at most `concurrency` questions in flight.
+
+    Each question's rows are handed to the ordered writer once the question finishes,
+    so the output stays grouped per question and in dataset order. When `outcomes`
+    is given, it is filled with the status, attempt count, time and token usage of
+    every question before its rows are submitted.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(index: int):
+        item = items[index]
+        async with semaphore:
+            start_time = time.monotonic()
+            rows, error, usage = await collect_question_rows(item, agent, language, model)
+            elapsed = time.monotonic() - start_time
+        if outcomes is not None:
+            outcomes[index] = {
+                "status": STATUS_FAILED if error else STATUS_DONE,
+                "attempts": len(rows) if not error else max(0, len(rows) - 1),
+                "time": elapsed,
+                "error": error or "",
+                "usage": usage,
+            }
+        writer.submit(index, rows)
+
+    tasks = [asyncio.create_task(run_one(i)) for i in indices]
+
+    with tqdm(total=len(tasks), desc="Benchmarking") as progress:
+        for finished in asyncio.as_completed(tasks):
+            await finished
+            progress.update(1)
+
+
+async def run_benchmark_file(
+        csv_file_name: str,
+        items: List[dict[str, Any]],
+        agent,
+        language: str,
+        concurrency: int = 1,
+        model: str = DEFAULT_AGENT_MODEL,
+        indices: Optional[List[int]] = None,
+):
+    """
+    Runs the benchmark into `csv_file_name`, resuming from its completion journal.
+
+    Questions the journal marks as done are skipped. Rows of questions that failed
+    last time are removed from the CSV before those questions are retried. When
+    `indices` is given, only those positions of `items` are considered.
+    """
+    journal = CompletionJournal(journal_path_for(csv_file_name))
+    removed = drop_failed_rows(csv_file_name, journal)
+    if removed:
+        print(f"Removed {removed} rows of previously failed questions from '{csv_file_name}'.")
+
+    candidates = range(len(items)) if indices is None else indices
+    completed = journal.completed_ids()
+    indices = [i for i in candidates if question_id(i, items[i]) not in completed]
+    print(f"{len(candidates) - len(indices)} questions already completed, {len(indices)} scheduled.")
+    if not indices:
+        return
+
+    outcomes: dict[int, dict[str, Any]] = {}
+
+    def record_outcome(index: int):
+        outcome = outcomes.pop(index)
+        append_usage(csv_file_name, {
+            "question_id": question_id(index, items[index]),
+            "model": model,
+            "usage": outcome["usage"],
+        })
+        journal.record(
+            question_id(index, items[index]),
+            items[index]["question"],
+            outcome["status"],
+            outcome["attempts"],
+            outcome["time"],
+            outcome["error"],
+        )
+
+    file_exists = os.path.exists(csv_file_name) and os.path.getsize(csv_file_name) > 0
+    if file_exists:
+        upgrade_csv_header(csv_file_name)
+
+    with open(csv_file_name, 'a', newline='', encoding='utf-8') as f:
+        writer = OrderedCsvWriter(f, order=indices, on_flush=record_outcome)
+        if not file_exists:
+            writer.writeheader(CSV_HEADER)
+
+        await run_questions(items, indices, agent, writer, language, concurrency, outcomes, model)
+
+    summary = write_usage_summary(csv_file_name)
+    if summary:
+        totals = summary["totals"]
+        print(f"Token usage: {totals['input_tokens']} in ({totals['cached_tokens']} cached), "
+              f"{totals['output_tokens']} out, ~${totals['cost_usd']:.4f}")
@@ -0,0 +1,211 @@
+import asyncio
+import csv
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Any, Dict
+
+from src.benchmark.journal import CompletionJournal, journal_path_for, drop_failed_rows
+from src.benchmark.runner import question_id, upgrade_csv_header
+from src.benchmark.usage_report import usage_path_for, usage_summary_path_for, write_usage_summary
+
+_worker_loop: asyncio.AbstractEventLoop | None = None
+_worker_agent = None
+
+
+def shard_csv_path(csv_file_name: str | Path, shard: int, num_shards: int) -> Path:
+    csv_path = Path(csv_file_name)
+    return csv_path.with_name(f"{csv_path.stem}.shard{shard}of{num_shards}{csv_path.suffix}")
+
+
+def _shard_files(csv_file_name: str | Path) -> List[Path]:
+    csv_path = Path(csv_file_name)
+    pattern = re.compile(rf"^{re.escape(csv_path.stem)}\.shard\d+of\d+{re.escape(csv_path.suffix)}$")
+    if not csv_path.parent.exists():
+        return []
+    return sorted(p for p in csv_path.parent.iterdir() if pattern.match(p.name))
+
+
+def partition(indices: List[int], num_shards: int) -> List[List[int]]:
+    """Round-robin split, so slow and fast regions of the dataset spread over all shards."""
+    return [indices[shard::num_shards] for shard in range(num_shards)]
+
+
+def merge_shards(csv_file_name: str | Path, items: List[dict[str, Any]]) -> int:
+    """
+    Merges all shard CSVs of `csv_file_name` into it, in canonical question order.
+
+    Rows already in the main CSV are kept. All rows are stably sorted by the dataset
+    position of their question, so attempts stay grouped and in their original order.
+    Shard journals and usage records are appended to the main ones, then the shard
+    files are removed.
+    Returns the number of merged shard files.
+    """
+    csv_path = Path(csv_file_name)
+    shard_files = _shard_files(csv_path)
+    if not shard_files:
+        return 0
+
+    header = None
+    rows = []
+    for path in ([csv_path] if csv_path.exists() else []) + shard_files:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            file_rows = list(csv.reader(f))
+        if not file_rows:
+            continue
+        header = header or file_rows[0]
+        rows.extend(row for row in file_rows[1:] if row)
+
+    # Journals first: if we crash before the CSV is replaced, the shard files are still
+    # there and the next merge redoes the work; duplicate journal lines are harmless.
+    for path_for in (journal_path_for, usage_path_for):
+        with open(path_for(csv_path), 'a', encoding='utf-8') as out:
+            for path in shard_files:
+                shard_file = path_for(path)
+                if shard_file.exists():
+                    out.write(shard_file.read_text(encoding='utf-8'))
+            out.flush()
+            os.fsync(out.fileno())
+
+    if header is not None:
+        question_col = header.index("original_question") if "original_question" in header else 0
+        position: Dict[str, int] = {}
+        for i, item in enumerate(items):
+            position.setdefault(item["question"], i)
+        rows.sort(key=lambda row: position.get(row[question_col], len(items)))
+
+        tmp_path = csv_path.with_suffix(csv_path.suffix + ".tmp")
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows([header] + rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, csv_path)
+
+    for path in shard_files:
+        path.unlink()
+        journal_path_for(path).unlink(missing_ok=True)
+        usage_path_for(path).unlink(missing_ok=True)
+        usage_summary_path_for(path).unlink(missing_ok=True)
+
+    return len(shard_files)
+
+
+def _init_worker(num_shards: int):
+    """Gives every worker process one long-lived event loop, so its session and clients stay valid across cells."""
+    global _worker_loop
+    # The rate limits are per host for the whole run; every shard gets its share
+    os.environ["RATE_LIMIT_PROCESSES"] = str(num_shards)
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+
+
+def _run_shard(
+        csv_file_name: str,
+        language: str,
+        model: str,
+        indices: List[int],
+        concurrency: int,
+):
+    from src.agent.graph import create_sparql_agent
+    from src.benchmark.runner import run_benchmark_file
+    from src.dataset.qald_10 import load_qald_json
+
+    global _worker_agent
+    if _worker_agent is None:
+        _worker_agent = create_sparql_agent()
+
+    items = load_qald_json(lang=language)
+    _worker_loop.run_until_complete(run_benchmark_file(
+        csv_file_name,
+        items,
+        _worker_agent,
+        language=language,
+        concurrency=concurrency,
+        model=model,
+        indices=indices,
+    ))
+
+
+def _close_worker():
+    from src.databases.qdrant.qdrant import qdrant_db
+    from src.http_client.session import close_session
+    from src.wikidata.api import sparql_cache, search_cache, in_flight
+
+    async def close():
+        await qdrant_db.client.close()
+        await close_session()
+
+    _worker_loop.run_until_complete(close())
+    print(f"[shard worker {os.getpid()}] {sparql_cache.format_stats()}; {search_cache.format_stats()}; "
+          f"coalesced {in_flight.stats['shared']} duplicate Wikidata requests")
+
+
+class ShardPool:
+    """
+    A pool of `num_shards` spawned worker processes for sharded benchmark runs.
+
+    Each worker owns its event loop, embedder, Qdrant client and HTTP session, so the
+    CPU-bound parts of a question (embedding, re-ranking, SPARQL parsing) run on as
+    many cores as there are shards. The Wikidata rate limits are divided among the
+    workers. The workers live for the whole matrix run.
+    """
+
+    def __init__(self, num_shards: int):
+        self.num_shards = num_shards
+        self._executor = ProcessPoolExecutor(
+            max_workers=num_shards,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(num_shards,),
+        )
+
+    def run_cell(
+            self,
+            csv_file_name: str,
+            items: List[dict[str, Any]],
+            language: str,
+            model: str,
+            concurrency: int = 1,
+    ):
+        """Runs the unfinished questions of one cell across all shards and merges the results."""
+        if os.path.exists(csv_file_name):
+            upgrade_csv_header(csv_file_name)
+        merged = merge_shards(csv_file_name, items)
+        if merged:
+            print(f"Merged {merged} leftover shard files into '{csv_file_name}'.")
+
+        journal = CompletionJournal(journal_path_for(csv_file_name))
+        drop_failed_rows(csv_file_name, journal)
+        completed = journal.completed_ids()
+        pending = [i for i, item in enumerate(items) if question_id(i, item) not in completed]
+        print(f"{len(items) - len(pending)} questions already completed, "
+              f"{len(pending)} scheduled on {self.num_shards} shards.")
+
+        futures = [
+            self._executor.submit(
+                _run_shard,
+                str(shard_csv_path(csv_file_name, shard, self.num_shards)),
+                language,
+                model,
+                shard_indices,
+                concurrency,
+            )
+            for shard, shard_indices in enumerate(partition(pending, self.num_shards))
+            if shard_indices
+        ]
+        try:
+            for future in futures:
+                future.result()
+        finally:
+            merge_shards(csv_file_name, items)
+            write_usage_summary(csv_file_name)
+
+    def close(self):
+        for future in [self._executor.submit(_close_worker) for _ in range(self.num_shards)]:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Error during shard cleanup: {e}")
+        self._executor.shutdown()
@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+from src.llm.usage import summarize_calls
+
+
+def usage_path_for(csv_file_name: str | Path) -> Path:
+    csv_path = Path(csv_file_name)
+    return csv_path.with_name(f"{csv_path.stem}.usage.jsonl")
+
+
+def usage_summary_path_for(csv_file_name: str | Path) -> Path:
+    csv_path = Path(csv_file_name)
+    return csv_path.with_name(f"{csv_path.stem}.usage_summary.json")
+
+
+def append_usage(csv_file_name: str | Path, record: Dict[str, Any]):
+    """Appends the token usage of one question next to the benchmark CSV."""
+    with open(usage_path_for(csv_file_name), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def write_usage_summary(csv_file_name: str | Path) -> Dict[str, Any] | None:
+    """
+    Aggregates every per-question usage record of the CSV (across resumed runs; the
+    last record of a question wins) into a run summary with totals and a breakdown
+    per LLM call type and model.
+    """
+    usage_path = usage_path_for(csv_file_name)
+    if not usage_path.exists():
+        return None
+
+    per_question = {}
+    with open(usage_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                record = json.loads(line)
+                per_question[record["question_id"]] = record
+
+    calls = [call for record in per_question.values() for call in record["usage"]["by_call"]]
+    summary = summarize_calls(calls)
+    summary["questions"] = len(per_question)
+    summary["cost_incomplete"] = summary["cost_incomplete"] or any(
+        record["usage"].get("cost_incomplete") for record in per_question.values()
+    )
+
+    with open(usage_summary_path_for(csv_file_name), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
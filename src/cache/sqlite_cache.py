@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_CACHE_DIR = "../cache"
+
+# Eviction runs every this many writes rather than on every write
+EVICTION_INTERVAL = 200
+# Keys per statement in bulk lookups, below SQLite's host parameter limit
+BULK_CHUNK_SIZE = 500
+
+
+class SqliteCache:
+    """
+    Persistent key/value cache in a SQLite file, shared by processes and runs.
+
+    Values are stored as JSON with an expiry time. Negative entries (an empty result)
+    get their own, usually shorter, TTL so that answers that may appear later are
+    re-checked sooner. When the cache grows past `max_entries` the expired entries
+    and then the least recently written ones are evicted.
+
+    Configured through the environment, read on first use:
+    - CACHE_DIR: directory of the cache files (default ../cache)
+    - {NAME}_CACHE: set to 'off' to bypass the cache
+    - {NAME}_CACHE_TTL / {NAME}_CACHE_NEGATIVE_TTL: lifetimes in seconds
+    - {NAME}_CACHE_MAX_ENTRIES: size bound
+    """
+
+    def __init__(self, name: str, ttl: float, negative_ttl: float, max_entries: int):
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.enabled = True
+        self.path = Path(DEFAULT_CACHE_DIR) / f"{name}.sqlite"
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+        self._configured = False
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes_since_eviction = 0
+
+    def _configure(self):
+        if self._configured:
+            return
+        self._configured = True
+        prefix = f"{self.name.upper()}_CACHE"
+        self.enabled = os.getenv(prefix, "on").lower() != "off"
+        self.path = Path(os.getenv("CACHE_DIR", DEFAULT_CACHE_DIR)) / f"{self.name}.sqlite"
+        self.ttl = float(os.getenv(f"{prefix}_TTL", self.ttl))
+        self.negative_ttl = float(os.getenv(f"{prefix}_NEGATIVE_TTL", self.negative_ttl))
+        self.max_entries = int(os.getenv(f"{prefix}_MAX_ENTRIES", self.max_entries))
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, negative INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_created_at ON cache (created_at)")
+        return self._conn
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Returns (found, value). Expired entries count as misses."""
+        self._configure()
+        if not self.enabled:
+            return False, None
+
+        row = self._connection().execute(
+            "SELECT value, negative, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return False, None
+        if row[2] < time.time():
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return False, None
+
+        self.stats["negative_hits" if row[1] else "hits"] += 1
+        return True, json.loads(row[0])
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Bulk `get`: returns the live entries among `keys`, missing keys are left out."""
+        return {key: value for key, (value, _) in self.get_many_with_expiry(keys).items()}
+
+    def get_many_with_expiry(self, keys: List[str]) -> Dict[str, Tuple[Any, float]]:
+        """Like `get_many`, with the expiry time of every entry, e.g. for in-process caches in front of this one."""
+        self._configure()
+        if not self.enabled or not keys:
+            return {}
+
+        found = {}
+        now = time.time()
+        conn = self._connection()
+        for i in range(0, len(keys), BULK_CHUNK_SIZE):
+            chunk = keys[i:i + BULK_CHUNK_SIZE]
+            rows = conn.execute(
+                f"SELECT key, value, negative, expires_at FROM cache WHERE expires_at >= ? "
+                f"AND key IN ({', '.join('?' * len(chunk))})", (now, *chunk)
+            ).fetchall()
+            for key, value, negative, expires_at in rows:
+                self.stats["negative_hits" if negative else "hits"] += 1
+                found[key] = (json.loads(value), expires_at)
+        self.stats["misses"] += len(keys) - len(found)
+        return found
+
+    def put(self, key: str, value: Any, negative: bool = False):
+        self.put_many([(key, value, negative)])
+
+    def put_many(self, entries: Iterable[Tuple[str, Any, bool]]):
+        """Writes (key, value, negative) entries in one transaction."""
+        self._configure()
+        if not self.enabled:
+            return
+
+        now = time.time()
+        rows = [
+            (key, json.dumps(value, ensure_ascii=False), int(negative), now,
+             now + (self.negative_ttl if negative else self.ttl))
+            for key, value, negative in entries
+        ]
+        if not rows:
+            return
+        conn = self._connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO cache (key, value, negative, created_at, expires_at) VALUES (?, ?, ?, ?, ?)", rows
+        )
+        conn.commit()
+        self.stats["writes"] += len(rows)
+
+        self._writes_since_eviction += len(rows)
+        if self._writes_since_eviction >= EVICTION_INTERVAL:
+            self._writes_since_eviction = 0
+            self.evict()
+
+    def evict(self):
+        """Removes expired entries, then the oldest ones until the cache fits `max_entries`."""
+        conn = self._connection()
+        removed = conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),)).rowcount
+        overflow = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            removed += conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY created_at LIMIT ?)", (overflow,)
+            ).rowcount
+        conn.commit()
+        self.stats["evictions"] += removed
+
+    def format_stats(self) -> str:
+        lookups = self.stats["hits"] + self.stats["negative_hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] + self.stats["negative_hits"]) / lookups if lookups else 0.0
+        return (f"{self.name} cache: {lookups} lookups, {hit_rate:.1%} hit rate "
+                f"({self.stats['hits']} hits, {self.stats['negative_hits']} negative hits, "
+                f"{self.stats['misses']} misses of which {self.stats['expired']} expired), "
+                f"{self.stats['writes']} writes, {self.stats['evictions']} evicted")
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, Sequence, Tuple
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+DEFAULT_CASSETTE_PATH = "../cassettes/cassette.sqlite"
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class Cassette:
+    """
+    Record/replay store for every external call of the pipeline (LLM, Wikidata, Qdrant).
+
+    In record mode each request/response pair is stored in a SQLite file, keyed by a
+    hash of the request kind and its parameters, with the response as compressed JSON.
+    In replay mode the responses are served from the file instead of the network,
+    optionally delayed by a fixed latency and/or a fraction of the recorded latency.
+
+    Configured through the environment, read on first use so that the benchmark CLI
+    (and spawned shard workers, which inherit the environment) can set it:
+    - CASSETTE_MODE: off | record | replay (default off)
+    - CASSETTE_PATH: path of the SQLite file
+    - CASSETTE_LATENCY_MS: fixed delay added to every replayed response
+    - CASSETTE_LATENCY_SCALE: multiplier for the recorded latency (0 = full speed)
+    """
+
+    def __init__(self):
+        self._configured = False
+        self.mode = MODE_OFF
+        self.path = Path(DEFAULT_CASSETTE_PATH)
+        self.latency_ms = 0.0
+        self.latency_scale = 0.0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._llm_cache_installed = False
+
+    def _configure(self):
+        if self._configured:
+            return
+        self._configured = True
+        self.mode = os.getenv("CASSETTE_MODE", MODE_OFF).lower()
+        if self.mode not in (MODE_OFF, MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Unknown CASSETTE_MODE '{self.mode}'. Use off, record or replay.")
+        self.path = Path(os.getenv("CASSETTE_PATH", DEFAULT_CASSETTE_PATH))
+        self.latency_ms = float(os.getenv("CASSETTE_LATENCY_MS", "0"))
+        self.latency_scale = float(os.getenv("CASSETTE_LATENCY_SCALE", "0"))
+
+    @property
+    def enabled(self) -> bool:
+        self._configure()
+        return self.mode != MODE_OFF
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cassette ("
+                "key TEXT PRIMARY KEY, kind TEXT NOT NULL, elapsed_ms REAL NOT NULL, payload BLOB NOT NULL)"
+            )
+        return self._conn
+
+    @staticmethod
+    def request_key(kind: str, request: Any) -> str:
+        raw = json.dumps([kind, request], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, kind: str, request: Any) -> Tuple[bool, Any, float]:
+        """Returns (found, response, recorded latency in ms)."""
+        row = self._connection().execute(
+            "SELECT payload, elapsed_ms FROM cassette WHERE key = ?", (self.request_key(kind, request),)
+        ).fetchone()
+        if row is None:
+            return False, None, 0.0
+        return True, json.loads(zlib.decompress(row[0])), row[1]
+
+    def put(self, kind: str, request: Any, response: Any, elapsed_ms: float = 0.0):
+        payload = zlib.compress(json.dumps(response, ensure_ascii=False, default=str).encode("utf-8"))
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cassette (key, kind, elapsed_ms, payload) VALUES (?, ?, ?, ?)",
+            (self.request_key(kind, request), kind, elapsed_ms, payload)
+        )
+        conn.commit()
+
+    async def replay_delay(self, recorded_ms: float):
+        delay_ms = self.latency_ms + self.latency_scale * recorded_ms
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+    async def through(
+            self,
+            kind: str,
+            request: Any,
+            call: Callable[[], Awaitable[Any]],
+            encode: Callable[[Any], Any] = lambda value: value,
+            decode: Callable[[Any], Any] = lambda value: value,
+    ) -> Any:
+        """
+        Runs `call` according to the cassette mode.
+
+        `request` must be JSON-serializable and identify the call; `encode`/`decode`
+        convert the response to and from plain JSON for types such as Qdrant points.
+        """
+        if not self.enabled:
+            return await call()
+
+        if self.mode == MODE_REPLAY:
+            found, payload, recorded_ms = self.get(kind, request)
+            if not found:
+                raise CassetteMiss(f"No recorded '{kind}' response for request: {str(request)[:200]}")
+            await self.replay_delay(recorded_ms)
+            return decode(payload)
+
+        start_time = time.monotonic()
+        response = await call()
+        self.put(kind, request, encode(response), (time.monotonic() - start_time) * 1000)
+        return response
+
+    def install_llm_cache(self):
+        """Routes every LangChain chat model call through the cassette (idempotent)."""
+        if self.enabled and not self._llm_cache_installed:
+            set_llm_cache(CassetteLLMCache(self))
+            self._llm_cache_installed = True
+
+
+class CassetteLLMCache(BaseCache):
+    """
+    LangChain cache backed by the cassette. The cache key is LangChain's own
+    (prompt, llm_string) pair, which already covers the model, its parameters,
+    bound tools and structured-output schema.
+    """
+
+    KIND = "llm"
+
+    def __init__(self, store: Cassette):
+        self.store = store
+
+    def _replayed(self, prompt: str, llm_string: str) -> Tuple[Optional[RETURN_VAL_TYPE], float]:
+        if self.store.mode == MODE_RECORD:
+            # Record mode always goes to the model, so the cassette holds fresh responses
+            return None, 0.0
+        found, payload, recorded_ms = self.store.get(self.KIND, [prompt, llm_string])
+        if not found:
+            raise CassetteMiss(f"No recorded LLM response for prompt: {prompt[:200]}")
+        return [loads(generation) for generation in payload], recorded_ms
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self._replayed(prompt, llm_string)[0]
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        generations, recorded_ms = self._replayed(prompt, llm_string)
+        if generations is not None:
+            await self.store.replay_delay(recorded_ms)
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self.store.mode == MODE_RECORD:
+            self.store.put(self.KIND, [prompt, llm_string], [dumps(generation) for generation in return_val])
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        pass
+
+
+def round_vector(vector: Sequence[float], digits: int = 5) -> list[float]:
+    """Rounds an embedding so tiny float differences between machines map to the same key."""
+    return [round(float(x), digits) for x in vector]
+
+
+cassette = Cassette()
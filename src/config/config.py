@@ -2,6 +2,11 @@ from typing import Literal
 
 SupportedLanguage = Literal["en", "mk", "zh", "de", "ru"]
 
+# Model that drives the agent (tool calling and SPARQL generation)
+DEFAULT_AGENT_MODEL = "nvidia/nemotron-3-nano-30b-a3b:free"
+# Model used for the auxiliary NER and result validation calls
+DEFAULT_AUX_MODEL = "kwaipilot/kat-coder-pro:free"
+
 
 class BenchmarkConfig:
     """
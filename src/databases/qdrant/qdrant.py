@@ -6,6 +6,8 @@ from qdrant_client import AsyncQdrantClient, models
 from qdrant_client.conversions import common_types as types
 from qdrant_client.http.models import QueryResponse, Record, ScoredPoint
 
+from src.cassette.cassette import cassette, round_vector
+
 load_dotenv()
 
 
@@ -17,7 +19,11 @@ class QdrantDatabase:
         self.client = AsyncQdrantClient(url=os.getenv("QDRANT_HOST"), port=os.getenv("QDRANT_PORT", None))
 
     async def collection_exists(self, collection_name: str) -> bool:
-        return await self.client.collection_exists(collection_name)
+        return await cassette.through(
+            "qdrant_collection_exists",
+            collection_name,
+            lambda: self.client.collection_exists(collection_name)
+        )
 
     async def create_collection(
             self,
@@ -77,14 +83,24 @@ class QdrantDatabase:
                                 filter: Optional[Dict[str, Any]] = None) -> List[ScoredPoint]:
 
         field_condition = QdrantDatabase._generate_filter(filter=filter)
-        query_response = await self.client.query_points(
-            query=vector,
-            score_threshold=score_threshold,
-            collection_name=collection_name,
-            limit=top_k,
-            query_filter=field_condition
+
+        async def query() -> List[ScoredPoint]:
+            query_response = await self.client.query_points(
+                query=vector,
+                score_threshold=score_threshold,
+                collection_name=collection_name,
+                limit=top_k,
+                query_filter=field_condition
+            )
+            return query_response.points
+
+        return await cassette.through(
+            "qdrant_search",
+            [round_vector(vector), collection_name, score_threshold, top_k, filter],
+            query,
+            encode=lambda points: [p.model_dump(mode="json") for p in points],
+            decode=lambda points: [ScoredPoint.model_validate(p) for p in points]
         )
-        return query_response.points
 
     async def search_embeddings_batch(
             self,
@@ -108,9 +124,15 @@ class QdrantDatabase:
                 )
             )
 
-        return await self.client.query_batch_points(
-            collection_name=collection_name,
-            requests=search_requests
+        return await cassette.through(
+            "qdrant_search_batch",
+            [[round_vector(v) for v in vectors], collection_name, score_threshold, top_k, filter],
+            lambda: self.client.query_batch_points(
+                collection_name=collection_name,
+                requests=search_requests
+            ),
+            encode=lambda responses: [r.model_dump(mode="json") for r in responses],
+            decode=lambda responses: [QueryResponse.model_validate(r) for r in responses]
         )
 
     async def get_all_points(
@@ -1,5 +1,5 @@
 import asyncio
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Optional
 
 from src.config.config import BenchmarkConfig
 from src.databases.qdrant.qdrant import qdrant_db
@@ -7,6 +7,7 @@ from src.llm.embed_labels import embed_value
 from src.utils.format_examples import format_qa_sparql_examples
 from src.utils.map_candidates import map_candidates
 from src.utils.re_ranking import rerank_candidates
+from src.utils.timing import stopwatch, timed
 from src.wikidata.api import search_wikidata
 
 
@@ -30,11 +31,15 @@ async def fetch_similar_qa_pairs(question: str, lang: str):
 
 async def get_candidates(
         keywords: List[Dict[str, Any]],
-        lang: str
+        lang: str,
+        timings: Optional[Dict[str, float]] = None
 ) -> Any:
     """
     Fetches entities via Qdrant (Semantic) and Wikidata API (Keyword).
     CRITICALLY: It uses the NER 'context' to filter the Wikidata API results.
+
+    If `timings` is given, 'qdrant_ms' (embedding + vector search) and 'wikidata_search_ms'
+    (API search + re-ranking) are added to it. Both searches run concurrently.
     """
     if not keywords:
         return {}
@@ -47,31 +52,31 @@ async def get_candidates(
     query_vectors = []
     search_queries = []
 
-    for k in valid_keywords:
-        search_text = f"{k.get('value', '')} {k.get('context', '')}".strip()
-        search_queries.append(search_text)
-        query_vectors.append(embed_value(search_text))
+    with stopwatch(timings, "qdrant_ms"):
+        for k in valid_keywords:
+            search_text = f"{k.get('value', '')} {k.get('context', '')}".strip()
+            search_queries.append(search_text)
+            query_vectors.append(embed_value(search_text))
 
     # 2. Parallel Fetch
     # A. Qdrant Search (Semantic)
-    qdrant_batch_task = qdrant_db.search_embeddings_batch(
+    qdrant_batch_task = timed(qdrant_db.search_embeddings_batch(
         vectors=query_vectors,
         collection_name="qald_10_labels",
         score_threshold=0.6,
         top_k=5,
         filter={"lang": lang}
-    )
+    ), timings, "qdrant_ms")
 
     # B. Wikidata API Search (Keyword/Elastic)
-    wikidata_tasks = [
+    wikidata_tasks = timed(asyncio.gather(*[
         search_wikidata(keyword=k['value'], type=k.get('type', 'item'), lang=lang)
         for k in valid_keywords
-    ]
+    ]), timings, "wikidata_search_ms")
 
-    all_results = await asyncio.gather(qdrant_batch_task, *wikidata_tasks)
-
-    qdrant_results_per_keyword = all_results[0]
-    wikidata_results_per_keyword = all_results[1:]
+    qdrant_results_per_keyword, wikidata_results_per_keyword = await asyncio.gather(
+        qdrant_batch_task, wikidata_tasks
+    )
 
     candidates_map: Dict[str, List[Dict[str, Any]]] = {}
 
@@ -81,7 +86,8 @@ async def get_candidates(
         w_res_raw = wikidata_results_per_keyword[i] if i < len(wikidata_results_per_keyword) else []
 
         # 3. Apply Re-ranking to Wikidata Results
-        w_res_filtered = rerank_candidates(search_queries[i], w_res_raw, threshold=0.85)
+        with stopwatch(timings, "wikidata_search_ms"):
+            w_res_filtered = rerank_candidates(search_queries[i], w_res_raw, threshold=0.85)
 
         # 4. Merge
         combined_list = map_candidates(w_res_filtered, q_res)
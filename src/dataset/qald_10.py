@@ -1,6 +1,9 @@
 import json
 from typing import Any, Optional
 
+# Adjust path if necessary
+QALD_JSON_PATH = "../qald_10_with_mk.json"
+
 # Mapping based on your specific file structure
 # 0=en, 1=zh, 2=de.
 # We assume 'mk' might be explicitly labeled or at a specific index.
@@ -44,10 +47,7 @@ def load_qald_json(lang: str = "en") -> list[dict[str, Any]]:
     """
     Loads QALD data and filters for the specific language.
     """
-    # Adjust path if necessary
-    file_path = "../qald_10_with_mk.json"
-
-    with open(file_path, "r", encoding="utf-8") as f:
+    with open(QALD_JSON_PATH, "r", encoding="utf-8") as f:
         data = json.load(f)
 
     questions = data.get("questions", [])
@@ -84,6 +84,7 @@ def load_qald_json(lang: str = "en") -> list[dict[str, Any]]:
                     ]
 
         row = {
+            "id": str(question.get("id", len(rows))),
             "question": q_string,
             "ground_truth_sparql": ground_truth_sparql,
             "expected_result": expected_result,
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import time
+from typing import Dict, Tuple
+from urllib.parse import urlparse
+
+# Requests per second and burst capacity per endpoint type. Override with
+# RATE_LIMIT_<TYPE>_RPS / RATE_LIMIT_<TYPE>_BURST, e.g. RATE_LIMIT_WIKIDATA_SPARQL_RPS=2.
+# The budgets are per host for all processes together: RATE_LIMIT_PROCESSES (set for the
+# benchmark shard workers) gives every process its share.
+DEFAULT_BUDGETS: Dict[str, Tuple[float, int]] = {
+    "wikidata_api": (5.0, 10),
+    "wikidata_sparql": (2.0, 5),
+}
+FALLBACK_BUDGET = (1.0, 1)
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, at most `capacity` stored.
+
+    `acquire` reserves a token synchronously (no await between reading and updating
+    the state), so concurrent coroutines can never both take the same token, and no
+    lock is needed. The bucket is therefore not bound to any event loop.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _reserve(self) -> float:
+        """Takes one token and returns how long the caller must wait before using it."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        return max(wait, self._blocked_until - now)
+
+    async def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self, retry_after: float):
+        """Blocks the bucket for `retry_after` seconds, e.g. after a 429 with Retry-After."""
+        now = time.monotonic()
+        self._blocked_until = max(self._blocked_until, now + retry_after)
+        # Drop saved-up burst so the first requests after the pause do not hit the limit again
+        self._tokens = min(self._tokens, 0.0)
+        self._updated = now
+
+
+class RateLimiter:
+    """Registry of token buckets, one per (endpoint type, host)."""
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    @staticmethod
+    def _budget(endpoint_type: str) -> Tuple[float, int]:
+        rate, burst = DEFAULT_BUDGETS.get(endpoint_type, FALLBACK_BUDGET)
+        prefix = f"RATE_LIMIT_{endpoint_type.upper()}"
+        processes = max(1, int(os.getenv("RATE_LIMIT_PROCESSES", 1)))
+        rate, burst = float(os.getenv(f"{prefix}_RPS", rate)), int(os.getenv(f"{prefix}_BURST", burst))
+        return rate / processes, max(1, burst // processes)
+
+    def bucket(self, endpoint_type: str, url: str) -> TokenBucket:
+        key = (endpoint_type, urlparse(url).netloc)
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(*self._budget(endpoint_type))
+        return self._buckets[key]
+
+    def configure(self, endpoint_type: str, url: str, rate: float, capacity: int):
+        self._buckets[(endpoint_type, urlparse(url).netloc)] = TokenBucket(rate, capacity)
+
+    async def acquire(self, endpoint_type: str, url: str):
+        await self.bucket(endpoint_type, url).acquire()
+
+    def penalize(self, endpoint_type: str, url: str, retry_after: float):
+        self.bucket(endpoint_type, url).penalize(retry_after)
+
+
+def parse_retry_after(value: str | None, default: float) -> float:
+    """Parses a Retry-After header given in seconds; HTTP dates fall back to `default`."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return default
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Tuple
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Sliding-window circuit breaker.
+
+    Opens when, among the calls of the last `window_seconds` (at most `window_size`),
+    at least `min_calls` were made and the share of failures reaches `failure_ratio`.
+    While open, `allow` refuses calls; after `open_seconds` one probe call is let
+    through (half-open), and its outcome closes or re-opens the breaker. Purely
+    synchronous, so it is safe across event loops.
+    """
+
+    def __init__(
+            self,
+            window_size: int = 30,
+            window_seconds: float = 60.0,
+            min_calls: int = 10,
+            failure_ratio: float = 0.5,
+            open_seconds: float = 30.0,
+    ):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self.state = STATE_CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.state = STATE_HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == STATE_HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record(self, success: bool):
+        now = time.monotonic()
+        if self.state == STATE_HALF_OPEN:
+            self._probe_in_flight = False
+            if success:
+                self.state = STATE_CLOSED
+                self._outcomes.clear()
+            else:
+                self._open(now)
+            return
+
+        self._outcomes.append((now, success))
+        while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+            self._outcomes.popleft()
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        if (self.state == STATE_CLOSED and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.failure_ratio):
+            self._open(now)
+
+    def release(self):
+        """Called when an allowed call ends without an outcome (e.g. cancelled), so a probe slot is not lost."""
+        if self.state == STATE_HALF_OPEN:
+            self._probe_in_flight = False
+
+    def _open(self, now: float):
+        if self.state != STATE_OPEN:
+            print(f"Circuit breaker opened; failing fast for {self.open_seconds:g}s.")
+        self.state = STATE_OPEN
+        self._opened_at = now
+
+
+class LatencyTracker:
+    """Keeps recent latencies of successful calls and reports a percentile of them."""
+
+    def __init__(self, window_size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window_size)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, p: float, default: float) -> float:
+        if len(self._samples) < self.min_samples:
+            return default
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+async def hedged(
+        call: Callable[[], Awaitable[Any]],
+        delay: float,
+        failed: Callable[[Any], bool] = lambda result: result is None,
+) -> Any:
+    """
+    Runs `call`; if it has not finished after `delay` seconds, starts a second, identical
+    call. The first successful result wins and the other call is cancelled. Only use it
+    for idempotent requests.
+    """
+    tasks = {asyncio.ensure_future(call())}
+    result, error = None, None
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            tasks.add(asyncio.ensure_future(call()))
+
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                result = task.result()
+                if not failed(result):
+                    return result
+        if result is None and error is not None:
+            raise error
+        return result
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -1,26 +1,73 @@
-from typing import Optional
+import asyncio
+import os
+from typing import Dict
+from weakref import WeakKeyDictionary
 
 import aiohttp
 
-_session: Optional[aiohttp.ClientSession] = None
+USER_AGENT = "MyWikidataBot/1.0 (my-project-url.com; author)"
+
+try:
+    import brotli  # noqa: F401  (lets aiohttp decode br responses)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# One session per event loop: a session cannot be used from a loop other than its own,
+# and the Streamlit chat runs every message on a new loop
+_sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = WeakKeyDictionary()
+
+
+def request_timeout(total: float) -> aiohttp.ClientTimeout:
+    """
+    Timeout for a request with its own total limit. A per-request ClientTimeout replaces
+    the session's, so it repeats the session's connect timeout.
+    """
+    return aiohttp.ClientTimeout(total=total, connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", 10)))
+
+
+def _create_session() -> aiohttp.ClientSession:
+    """
+    Creates a session with a pooled connector, configured from the environment:
+    - HTTP_POOL_LIMIT / HTTP_POOL_LIMIT_PER_HOST: open connections in total / per host (100 / 30)
+    - HTTP_KEEPALIVE_SECONDS: how long idle connections are kept for reuse (60)
+    - HTTP_DNS_TTL: seconds DNS lookups are cached (300)
+    - HTTP_CONNECT_TIMEOUT / HTTP_TIMEOUT: connect and total timeout of a request (10 / 60);
+      requests may pass a shorter total timeout with `request_timeout`
+    """
+    connector = aiohttp.TCPConnector(
+        limit=int(os.getenv("HTTP_POOL_LIMIT", 100)),
+        limit_per_host=int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 30)),
+        keepalive_timeout=float(os.getenv("HTTP_KEEPALIVE_SECONDS", 60)),
+        ttl_dns_cache=int(os.getenv("HTTP_DNS_TTL", 300)),
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=request_timeout(float(os.getenv("HTTP_TIMEOUT", 60))),
+        headers={"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING},
+    )
 
 
 def get_session() -> aiohttp.ClientSession:
     """
-    Returns the shared aiohttp.ClientSession, creating it if it doesn't exist.
+    Returns the aiohttp.ClientSession of the running event loop, creating it if it doesn't exist.
     """
-    global _session
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
     # Create a new session if one doesn't exist or if the old one is closed.
-    if _session is None or _session.closed:
-        _session = aiohttp.ClientSession()
-    return _session
+    if session is None or session.closed:
+        # Sessions of loops that were closed without close_session can no longer be used
+        for stale_loop in [stale_loop for stale_loop in _sessions if stale_loop.is_closed()]:
+            del _sessions[stale_loop]
+        session = _create_session()
+        _sessions[loop] = session
+    return session
 
 
 async def close_session():
     """
-    Closes the shared aiohttp.ClientSession if it exists and is open.
+    Closes the aiohttp.ClientSession of the running event loop if it exists and is open.
     """
-    global _session
-    if _session and not _session.closed:
-        await _session.close()
-    _session = None
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session and not session.closed:
+        await session.close()
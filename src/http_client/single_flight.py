@@ -0,0 +1,54 @@
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from weakref import WeakKeyDictionary
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+        self.shared = False
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for `key` is in flight, further
+    callers wait for its result instead of starting their own.
+
+    The call runs in its own task, so one caller being cancelled does not cancel the
+    others; the call itself is cancelled only when every caller has gone. Calls are
+    tracked per event loop, so the same instance works across the per-message loops of
+    the Streamlit chat. Callers of a shared call each get a deep copy of the result,
+    since some of them mutate it (e.g. re-ranking scores).
+    """
+
+    def __init__(self):
+        self._flights: WeakKeyDictionary = WeakKeyDictionary()
+        self.stats = {"calls": 0, "shared": 0}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        in_flight: Dict[Hashable, _Flight] = self._flights.setdefault(loop, {})
+
+        flight = in_flight.get(key)
+        if flight is None or flight.task.done():
+            self.stats["calls"] += 1
+            flight = _Flight(loop.create_task(call()))
+            in_flight[key] = flight
+            flight.task.add_done_callback(
+                lambda _: in_flight.pop(key) if in_flight.get(key) is flight else None
+            )
+        else:
+            self.stats["shared"] += 1
+            flight.shared = True
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+        return copy.deepcopy(result) if flight.shared else result
@@ -6,6 +6,8 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_ollama import ChatOllama
 from langchain_openai import ChatOpenAI
 
+from src.cassette.cassette import cassette
+
 
 class LLMProvider:
     """
@@ -20,9 +22,19 @@ class LLMProvider:
         self.ollama_api_key = os.getenv("OLLAMA_API_KEY")
         self.zhipu_api_key = os.getenv("ZHIPU_API_KEY")
         self.google_api_key = os.getenv("GOOGLE_API_KEY")
-
+        self._models: dict[str, BaseChatModel] = {}
 
     def get_model(self, model_identifier: str) -> BaseChatModel:
+        """
+        Returns the chat model for `model_identifier`. Instances are cached, so every
+        caller (and every benchmark cell) reuses the same client and its connection pool.
+        """
+        cassette.install_llm_cache()
+        if model_identifier not in self._models:
+            self._models[model_identifier] = self._create_model(model_identifier)
+        return self._models[model_identifier]
+
+    def _create_model(self, model_identifier: str) -> BaseChatModel:
         # --- Ollama Models ---
         if model_identifier.startswith("ollama/"):
             model_name = model_identifier.split("/", 1)[1]
@@ -0,0 +1,131 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult, ChatGeneration
+
+# USD per 1M tokens: (input, cached input, output). Models ending in ':free' cost nothing.
+MODEL_PRICING = {
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gemini-2.0-flash": (0.10, 0.025, 0.40),
+    "gemini-2.5-flash": (0.30, 0.075, 2.50),
+}
+
+# What the LLM calls made inside each graph node are used for
+NODE_CALLS = {
+    "retriever": "ner",
+    "llm": "tool_calling",
+    "tool_executor": "sparql_generation",
+    "validator": "validation",
+}
+
+
+def estimate_cost(model: str, input_tokens: int, cached_tokens: int, output_tokens: int) -> Optional[float]:
+    """Returns the cost in USD, or None when the model has no known price."""
+    if model.endswith(":free"):
+        return 0.0
+    name = model.rsplit("/", 1)[-1]
+    matches = [key for key in MODEL_PRICING if name.startswith(key)]
+    if not matches:
+        return None
+    input_price, cached_price, output_price = MODEL_PRICING[max(matches, key=len)]
+    uncached = max(0, input_tokens - cached_tokens)
+    return (uncached * input_price + cached_tokens * cached_price + output_tokens * output_price) / 1_000_000
+
+
+class UsageTracker(BaseCallbackHandler):
+    """
+    LangChain callback that records the token usage of every chat model call,
+    tagged with the graph node it ran in and the model identifier.
+
+    Pass it in the run config (`agent.astream(state, config={"callbacks": [tracker]})`);
+    it propagates to the NER, tool-calling, SPARQL-generation and validator calls.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+        self._runs: Dict[UUID, Dict[str, str]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any):
+        metadata = metadata or {}
+        invocation_params = kwargs.get("invocation_params") or {}
+        node = metadata.get("langgraph_node", "unknown")
+        self._runs[run_id] = {
+            "node": node,
+            "call": NODE_CALLS.get(node, node),
+            "model": metadata.get("ls_model_name") or invocation_params.get("model")
+                     or invocation_params.get("model_name") or "unknown",
+        }
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        info = self._runs.pop(run_id, {"node": "unknown", "call": "unknown", "model": "unknown"})
+        input_tokens = output_tokens = cached_tokens = 0
+
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(generation.message, "usage_metadata", None) \
+                    if isinstance(generation, ChatGeneration) else None
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+                    cached_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+
+        if not (input_tokens or output_tokens):
+            # Some providers only report usage in llm_output
+            token_usage = (response.llm_output or {}).get("token_usage") or {}
+            input_tokens = token_usage.get("prompt_tokens", 0)
+            output_tokens = token_usage.get("completion_tokens", 0)
+            cached_tokens = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+
+        self.calls.append({
+            **info,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cached_tokens": cached_tokens,
+            "cost_usd": estimate_cost(info["model"], input_tokens, cached_tokens, output_tokens),
+        })
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._runs.pop(run_id, None)
+
+    def summary(self) -> Dict[str, Any]:
+        return summarize_calls(self.calls)
+
+
+def summarize_calls(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregates call records into totals and a breakdown per (call, model)."""
+
+    def empty():
+        return {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0, "cost_usd": 0.0}
+
+    totals = empty()
+    breakdown = defaultdict(empty)
+    unpriced = False
+
+    for call in calls:
+        for bucket in (totals, breakdown[f"{call['call']}|{call['model']}"]):
+            bucket["calls"] += call.get("calls", 1)
+            bucket["input_tokens"] += call["input_tokens"]
+            bucket["output_tokens"] += call["output_tokens"]
+            bucket["cached_tokens"] += call["cached_tokens"]
+            if call["cost_usd"] is None:
+                unpriced = True
+            else:
+                bucket["cost_usd"] += call["cost_usd"]
+
+    return {
+        "totals": totals,
+        "by_call": [
+            {"call": key.split("|", 1)[0], "model": key.split("|", 1)[1], **values}
+            for key, values in sorted(breakdown.items())
+        ],
+        # Costs leave out calls to models without a known price
+        "cost_incomplete": unpriced,
+    }
@@ -1,108 +1,87 @@
+import argparse
 import asyncio
-import csv
 import os
-from typing import Any
 
-from langchain_core.messages import HumanMessage
-from tqdm import tqdm
-
-from src.agent.graph import create_sparql_agent
-from src.agent.prompts import sparql_agent_instruction
-from src.config.config import BenchmarkConfig
+from src.benchmark.matrix import run_matrix, DEFAULT_OUTPUT_DIR
+from src.config.config import BenchmarkConfig, DEFAULT_AGENT_MODEL
 from src.databases.qdrant.qdrant import qdrant_db
-from src.dataset.qald_10 import load_qald_json
 from src.http_client.session import close_session
 
 TARGET_LANGUAGE = "en"
 
-CSV_HEADER = [
-    "original_question",
-    "rephrased_question",
-    "ner",
-    "candidates",
-    "examples",
-    "generated_query",
-    "result",
-    "time"
-]
-
 
-async def process_question_and_write_attempts(
-        item: dict[str, Any],
-        agent,
-        csv_writer,
-        language: str,
-):
-    """Streams the agent's execution and writes each tool attempt to the CSV."""
-    question = "Which country was Bill Gates born in?"  # item["question"]
-
-    initial_state = {
-        "messages": [HumanMessage(content=sparql_agent_instruction.format(user_task=question))],
-        "original_question": question,
-        "attempts": 0,
-        "log_data": [],
-        "language": language
-    }
+def get_arg_parser():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--languages', type=str, nargs='+', default=[TARGET_LANGUAGE],
+                        help='QALD-10 languages to benchmark')
+    parser.add_argument('--models', type=str, nargs='+', default=[DEFAULT_AGENT_MODEL],
+                        help='model identifiers (as understood by LLMProvider) that drive the agent')
+    parser.add_argument('--output_dir', type=str, default=DEFAULT_OUTPUT_DIR,
+                        help='directory for the per language/model CSVs')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='number of questions that run through the agent at the same time')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='split the questions of every cell across this many worker processes')
+    parser.add_argument('--cassette', type=str, choices=['off', 'record', 'replay'], default=None,
+                        help='record every LLM/Wikidata/Qdrant call to a cassette, or replay them offline')
+    parser.add_argument('--cassette_path', type=str, default=None, help='path of the cassette file')
+    parser.add_argument('--sparql_backend', type=str, choices=['http', 'local'], default=None,
+                        help='run SPARQL queries on the public endpoint or on a local rdflib store')
+    parser.add_argument('--local_store_path', type=str, default=None,
+                        help='RDF file of the local SPARQL store (see src/wikidata/build_local_store.py)')
+    parser.add_argument('--neighbor_index_dir', type=str, default=None,
+                        help='enrich candidates from the offline neighbor index instead of SPARQL '
+                             '(see src/wikidata/build_neighbor_index.py)')
+    parser.add_argument('--type_index_dir', type=str, default=None,
+                        help='answer entity schema lookups from the offline type index '
+                             '(see src/wikidata/build_type_index.py)')
+    parser.add_argument('--skip_analysis', action='store_true',
+                        help='only write the raw CSVs, do not run AnalysisPipeline on them')
+    return parser
+
+
+async def main(args):
+    # The cassette reads its settings from the environment, which shard workers inherit
+    if args.cassette:
+        os.environ["CASSETTE_MODE"] = args.cassette
+    if args.cassette_path:
+        os.environ["CASSETTE_PATH"] = args.cassette_path
+    if args.sparql_backend:
+        os.environ["SPARQL_BACKEND"] = args.sparql_backend
+    if args.local_store_path:
+        os.environ["LOCAL_STORE_PATH"] = args.local_store_path
+    if args.neighbor_index_dir:
+        os.environ["NEIGHBOR_INDEX_DIR"] = args.neighbor_index_dir
+    if args.type_index_dir:
+        os.environ["TYPE_INDEX_DIR"] = args.type_index_dir
 
     try:
-        async for step in agent.astream(initial_state):
-            if "tool_executor" in step:
-                state = step["tool_executor"]
-
-                new_logs = state.get("log_data", [])
-
-                for log_entry in new_logs:
-                    if log_entry:
-                        row = [log_entry.get(h, "") for h in CSV_HEADER]
-                        csv_writer.writerow(row)
-
-    except Exception as e:
-        print(f"\nCaught a streaming error for question '{question}': {e}")
-        error_row = {"original_question": question, "result": f"STREAMING FAILED: {e}"}
-        row = [error_row.get(h, "") for h in CSV_HEADER]
-        csv_writer.writerow(row)
-
-
-async def main():
-    try:
-        config = BenchmarkConfig(TARGET_LANGUAGE)
-        print(f"Starting benchmark for language: {config.language.upper()}")
-        print(f"Using label collection: {config.get_collection_name('labels')}")
+        for language in args.languages:
+            BenchmarkConfig.validate_language(language)
     except ValueError as e:
         print(f"Configuration Error: {e}")
         return
 
-    csv_file_name = f'../results/benchmark/{config.language}.csv'
-    file_exists = os.path.exists(csv_file_name)
-
-    with open(csv_file_name, 'a', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-
-        if not file_exists:
-            writer.writerow(CSV_HEADER)
-
-        benchmark_data = load_qald_json(lang=config.language)
-
-        print("Compiling the SPARQL agent...")
-        sparql_agent = create_sparql_agent()
-        print("Agent compiled successfully. Starting processing...")
-
-        for item in tqdm(benchmark_data[:], desc="Benchmarking"):
-            await process_question_and_write_attempts(
-                item,
-                sparql_agent,
-                writer,
-                language=config.language
-            )
-
-    print(f"\n\nSCRIPT FINISHED. Results are in '{csv_file_name}'.")
+    print(f"Starting benchmark for languages {args.languages} and models {args.models}")
 
     try:
-        await qdrant_db.client.close()
-        await close_session()
-    except Exception as e:
-        print(f"Error during cleanup: {e}")
+        await run_matrix(
+            languages=args.languages,
+            models=args.models,
+            output_dir=args.output_dir,
+            concurrency=args.concurrency,
+            analyze=not args.skip_analysis,
+            shards=args.shards,
+        )
+    finally:
+        try:
+            await qdrant_db.client.close()
+            await close_session()
+        except Exception as e:
+            print(f"Error during cleanup: {e}")
+
+    print(f"\n\nSCRIPT FINISHED. Results are in '{args.output_dir}'.")
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    asyncio.run(main(get_arg_parser().parse_args()))
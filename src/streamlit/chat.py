@@ -12,7 +12,11 @@ if project_root not in sys.path:
 
 import asyncio
 import streamlit as st
+
+# Interactive use: bound tail latency by hedging slow SPARQL requests
+os.environ.setdefault("SPARQL_HEDGE", "on")
 from src.agent.graph import create_sparql_agent
+from src.http_client.session import close_session
 
 # ... rest of the streamlit code provided previously
 # --- Page Config ---
@@ -39,7 +43,11 @@ def run_async(coroutine):
     """Helper to run async code in Streamlit"""
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
-    return loop.run_until_complete(coroutine)
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        # The HTTP session belongs to this loop; close it before the loop goes away
+        loop.run_until_complete(close_session())
 
 
 # --- Sidebar: Graph Visualization ---
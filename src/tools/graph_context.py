@@ -1,66 +1,248 @@
 import asyncio
-from typing import List
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 
+from src.cache.sqlite_cache import SqliteCache
 from src.wikidata.api import execute_sparql_query
+from src.wikidata.labels import fetch_labels
+from src.wikidata.neighbor_index import get_neighbor_index
 
-OUTGOING_QUERY = """
-SELECT DISTINCT ?propLabel ?valLabel WHERE {{
-  wd:{qid} ?p ?val .
-  ?prop wikibase:directClaim ?p .
-  ?prop rdfs:label ?propLabel .
-  ?val rdfs:label ?valLabel .
-  FILTER(LANG(?propLabel) = "en" && LANG(?valLabel) = "en")
-}} LIMIT 5
-"""
+# Edges shown per candidate and direction
+NEIGHBORS_PER_ITEM = 5
+# Edges fetched per candidate and direction; more than are shown, since edges whose
+# entities have no label in the question language (or English) are skipped
+STRUCTURE_PER_ITEM = 2 * NEIGHBORS_PER_ITEM
+
+# Neighbor structure (property and entity IDs, no labels) per QID, shared by all languages
+neighbor_store = SqliteCache("neighbors", ttl=7 * 24 * 3600, negative_ttl=24 * 3600, max_entries=500_000)
+
+LRU_SIZE = 10_000
+
+# Per-question enrichment budgets (see `enrich_candidates`)
+DEFAULT_TIME_BUDGET = 4.0
+DEFAULT_REQUEST_BUDGET = 6
+DEFAULT_WAVE_SIZE = 10
+
+# One subquery per item, so every item gets its own LIMIT; a single VALUES block over all
+# items could not cap them individually and hubs would crowd out the other items
+OUTGOING_ITEM_QUERY = """
+  {{ SELECT DISTINCT ?item ?prop ?other WHERE {{
+    VALUES ?item {{ wd:{qid} }}
+    ?item ?p ?other .
+    ?prop wikibase:directClaim ?p .
+    FILTER(STRSTARTS(STR(?other), "http://www.wikidata.org/entity/Q"))
+  }} LIMIT {limit} }}"""
+
+INCOMING_ITEM_QUERY = """
+  {{ SELECT DISTINCT ?item ?prop ?other WHERE {{
+    VALUES ?item {{ wd:{qid} }}
+    ?other ?p ?item .
+    ?prop wikibase:directClaim ?p .
+  }} LIMIT {limit} }}"""
 
-INCOMING_QUERY = """
-SELECT DISTINCT ?subjLabel ?propLabel WHERE {{
-  ?subj ?p wd:{qid} .
-  ?prop wikibase:directClaim ?p .
-  ?prop rdfs:label ?propLabel .
-  ?subj rdfs:label ?subjLabel .
-  FILTER(LANG(?propLabel) = "en" && LANG(?subjLabel) = "en")
-}} LIMIT 5
+BATCH_QUERY = """
+SELECT ?item ?prop ?other WHERE {{{branches}
+}}
 """
 
+Structure = Dict[str, List[List[str]]]
 
-async def get_entity_neighbors(qid: str) -> List[str]:
+
+class NeighborCache:
     """
-    Fetches a few examples of how this entity is connected in the graph.
-    Returns a list of strings like "Riemannian geometry -> discoverer or inventor -> Bernhard Riemann"
+    Neighbor structure per QID, {"out": [[pid, value], ...], "in": [[pid, subject], ...]}:
+    an in-process LRU in front of the persistent `neighbor_store`, whose entries never
+    outlive the store's (negative entries expire after its negative TTL).
+    Labels are looked up separately (see `fetch_labels`), so every language reuses it.
     """
-    if not qid.startswith("Q"):
-        return []
 
-    results = []
+    def __init__(self, maxsize: int = LRU_SIZE):
+        self.maxsize = maxsize
+        self._lru: OrderedDict[str, Tuple[float, Structure]] = OrderedDict()
+
+    def _remember(self, qid: str, structure: Structure, expires_at: float):
+        self._lru[qid] = (expires_at, structure)
+        self._lru.move_to_end(qid)
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def lookup(self, qids: List[str]) -> Dict[str, Structure]:
+        """Returns the live entries among `qids`, checking the LRU first and then the store."""
+        found = {}
+        remaining = []
+        now = time.time()
+        for qid in qids:
+            entry = self._lru.get(qid)
+            if entry is not None and entry[0] >= now:
+                self._lru.move_to_end(qid)
+                found[qid] = entry[1]
+            else:
+                remaining.append(qid)
 
+        # Entries from the store keep their remaining lifetime there
+        for qid, (structure, expires_at) in neighbor_store.get_many_with_expiry(remaining).items():
+            found[qid] = structure
+            self._remember(qid, structure, expires_at)
+        return found
+
+    def update(self, structures: Dict[str, Structure]):
+        entries = []
+        now = time.time()
+        for qid, structure in structures.items():
+            negative = not structure["out"] and not structure["in"]
+            self._remember(qid, structure, now + (neighbor_store.negative_ttl if negative else neighbor_store.ttl))
+            entries.append((qid, structure, negative))
+        neighbor_store.put_many(entries)
+
+
+neighbor_cache = NeighborCache()
+
+
+def _batch_query(item_query: str, qids: List[str]) -> str:
+    branches = "\n  UNION".join(item_query.format(qid=qid, limit=STRUCTURE_PER_ITEM) for qid in qids)
+    return BATCH_QUERY.format(branches=branches)
+
+
+def _entity_id(binding: dict, variable: str) -> str:
+    return binding.get(variable, {}).get("value", "").rsplit("/", 1)[-1]
+
+
+async def _fetch_structures(qids: List[str]) -> Dict[str, Structure]:
+    """Neighbor structure of `qids` with one query per direction; nothing is returned if a query fails."""
+    max_results = STRUCTURE_PER_ITEM * len(qids)
     try:
         out_res, in_res = await asyncio.gather(
-            execute_sparql_query(OUTGOING_QUERY.format(qid=qid)),
-            execute_sparql_query(INCOMING_QUERY.format(qid=qid))
+            execute_sparql_query(_batch_query(OUTGOING_ITEM_QUERY, qids), max_results=max_results),
+            execute_sparql_query(_batch_query(INCOMING_ITEM_QUERY, qids), max_results=max_results)
         )
+    except Exception as e:
+        print(f"Error fetching neighbors for {', '.join(qids)}: {e}")
+        return {}
+    # None means the query failed; nothing is cached, so the next question retries
+    if out_res is None or in_res is None:
+        return {}
 
-        if out_res:
-            for r in out_res:
-                p = r.get("propLabel", {}).get("value", "?")
-                v = r.get("valLabel", {}).get("value", "?")
-                results.append(f"  - (This) -> [{p}] -> {v}")
+    structures = {qid: {"out": [], "in": []} for qid in qids}
+    for direction, rows in (("out", out_res), ("in", in_res)):
+        for row in rows:
+            qid = _entity_id(row, "item")
+            if qid in structures:
+                structures[qid][direction].append([_entity_id(row, "prop"), _entity_id(row, "other")])
+    return structures
 
-        if in_res:
-            for r in in_res:
-                s = r.get("subjLabel", {}).get("value", "?")
-                p = r.get("propLabel", {}).get("value", "?")
-                results.append(f"  - {s} -> [{p}] -> (This)")
 
-    except Exception as e:
-        print(f"Error fetching neighbors for {qid}: {e}")
+async def _label_neighbors(
+        qids: List[str],
+        structures: Dict[str, Structure],
+        language: str,
+) -> Dict[str, List[str]]:
+    """Fetches any missing neighbor structure of `qids`, then formats it with labels in `language` or English."""
+    missing = [qid for qid in qids if qid not in structures]
+    if missing:
+        fetched = await _fetch_structures(missing)
+        neighbor_cache.update(fetched)
+        structures = {**structures, **fetched}
+
+    entity_ids = {entity_id for qid in qids for edges in structures.get(qid, {}).values()
+                  for edge in edges for entity_id in edge}
+    labels = await fetch_labels(sorted(entity_ids), [language, "en"])
+
+    def label(entity_id: str) -> Optional[str]:
+        by_language = labels.get(entity_id, {})
+        return by_language.get(language) or by_language.get("en")
+
+    neighbors = {}
+    for qid in qids:
+        structure = structures.get(qid, {"out": [], "in": []})
+        outgoing, incoming = [], []
+        for pid, value in structure["out"]:
+            p, v = label(pid), label(value)
+            if p and v and len(outgoing) < NEIGHBORS_PER_ITEM:
+                outgoing.append(f"  - (This) -> [{p}] -> {v}")
+        for pid, subject in structure["in"]:
+            s, p = label(subject), label(pid)
+            if s and p and len(incoming) < NEIGHBORS_PER_ITEM:
+                incoming.append(f"  - {s} -> [{p}] -> (This)")
+        neighbors[qid] = outgoing + incoming
+    return neighbors
+
+
+async def get_neighbors_batch(
+        qids: List[str],
+        language: str = "en",
+        time_budget: Optional[float] = None,
+        request_budget: Optional[int] = None,
+        wave_size: int = DEFAULT_WAVE_SIZE,
+) -> Dict[str, List[str]]:
+    """
+    Fetches a few examples of how each entity is connected in the graph, from the offline
+    neighbor index when NEIGHBOR_INDEX_DIR is set, otherwise from the neighbor cache and,
+    for the entities not in it, one query for the outgoing and one for the incoming edges
+    per wave of `wave_size` entities. Labels are in `language`, falling back to English.
+
+    `qids` should be ordered by priority: with a `request_budget` (SPARQL queries) only
+    the first waves are fetched, and after `time_budget` seconds the waves still pending
+    are cancelled and their entities get no neighbors.
+    Returns {qid: ["  - (This) -> [discoverer or inventor] -> Bernhard Riemann", ...]}.
+    """
+    qids = list(dict.fromkeys(qid for qid in qids if qid.startswith("Q")))
+    if not qids:
+        return {}
+
+    index = get_neighbor_index()
+    if index is not None:
+        return {qid: index.neighbors(qid, language, limit=NEIGHBORS_PER_ITEM) for qid in qids}
 
-    return results
+    structures = neighbor_cache.lookup(qids)
+    missing = [qid for qid in qids if qid not in structures]
+    waves = [missing[i:i + wave_size] for i in range(0, len(missing), wave_size)]
+    if request_budget is not None:
+        # Every wave costs two queries, one per direction
+        waves = waves[:request_budget // 2]
+    # Cached entities only need labels and go first
+    cached = [qid for qid in qids if qid in structures]
+    if cached:
+        waves.insert(0, cached)
 
+    # Waves run concurrently; the rate limiter serves the earlier, better scored ones first
+    tasks = [asyncio.ensure_future(_label_neighbors(wave, structures, language)) for wave in waves]
+    neighbors = {qid: [] for qid in qids}
+    if tasks:
+        done, pending = await asyncio.wait(tasks, timeout=time_budget)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if task.exception() is not None:
+                print(f"Error enriching candidates: {task.exception()}")
+                continue
+            neighbors.update(task.result())
 
-async def enrich_candidates(candidates_map):
-    enrichment_tasks = []
+    enriched = sum(len(wave) for wave, task in zip(waves, tasks)
+                   if task.done() and not task.cancelled() and task.exception() is None)
+    if enriched < len(qids):
+        print(f"Enrichment budget exhausted: no graph context for {len(qids) - enriched} of {len(qids)} candidates.")
+    return neighbors
 
+
+async def get_entity_neighbors(qid: str, language: str = "en") -> List[str]:
+    """
+    Fetches a few examples of how this entity is connected in the graph.
+    Returns a list of strings like "Riemannian geometry -> discoverer or inventor -> Bernhard Riemann"
+    """
+    return (await get_neighbors_batch([qid], language)).get(qid, [])
+
+
+async def enrich_candidates(candidates_map, language: str = "en"):
+    """
+    Adds 'neighbors' to every Q-candidate, best scored first (Qdrant score or the
+    re-ranking similarity), within the budgets of the environment:
+    - ENRICH_TIME_BUDGET: seconds per retrieval pass (default 4)
+    - ENRICH_REQUEST_BUDGET: SPARQL queries per retrieval pass (default 6)
+    - ENRICH_WAVE_SIZE: candidates per pair of queries (default 10)
+    Candidates left out by the budgets get no neighbors; the prompt goes out without them.
+    """
     enrichment_targets = []
 
     for mention, cand_list in candidates_map.items():
@@ -68,10 +250,18 @@ async def enrich_candidates(candidates_map):
             for cand in cand_list:
                 qid = cand.get('id')
                 if qid and str(qid).startswith('Q'):
-                    enrichment_tasks.append(get_entity_neighbors(qid))
                     enrichment_targets.append(cand)
 
-    if enrichment_tasks:
-        results = await asyncio.gather(*enrichment_tasks)
-        for cand, neighbors in zip(enrichment_targets, results):
-            cand['neighbors'] = neighbors
+    if enrichment_targets:
+        # Stable sort: unscored candidates keep their order behind the scored ones
+        ordered = sorted(enrichment_targets, key=lambda cand: cand.get('score') or 0.0, reverse=True)
+        neighbors = await get_neighbors_batch(
+            [str(cand['id']) for cand in ordered],
+            language,
+            time_budget=float(os.getenv("ENRICH_TIME_BUDGET", DEFAULT_TIME_BUDGET)),
+            request_budget=int(os.getenv("ENRICH_REQUEST_BUDGET", DEFAULT_REQUEST_BUDGET)),
+            wave_size=int(os.getenv("ENRICH_WAVE_SIZE", DEFAULT_WAVE_SIZE)),
+        )
+        for cand in enrichment_targets:
+            # Candidates of different mentions may share a QID; each gets its own list
+            cand['neighbors'] = list(neighbors.get(str(cand['id']), []))
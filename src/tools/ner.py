@@ -3,6 +3,7 @@ from typing import List, Literal
 from pydantic import BaseModel, Field
 
 from src.agent.prompts import ner_prompt
+from src.config.config import DEFAULT_AUX_MODEL
 from src.llm.llm_provider import llm_provider
 
 
@@ -20,5 +21,5 @@ class NERResponse(BaseModel):
 
 async def get_ner_result(question: str) -> NERResponse:
     formatted_prompt = ner_prompt.format(question=question)
-    structured_llm = llm_provider.get_model("kwaipilot/kat-coder-pro:free").with_structured_output(NERResponse)
+    structured_llm = llm_provider.get_model(DEFAULT_AUX_MODEL).with_structured_output(NERResponse)
     return await structured_llm.ainvoke(formatted_prompt)
@@ -1,4 +1,5 @@
 from src.wikidata.api import execute_sparql_query
+from src.wikidata.type_index import get_type_index
 
 SCHEMA_QUERY_TEMPLATE = """
 SELECT ?value ?valueLabel WHERE {{
@@ -8,12 +9,51 @@ SELECT ?value ?valueLabel WHERE {{
 LIMIT 10
 """
 
+MAX_TYPES = 10
+
+
+def _schema_from_index(entity_id: str) -> str | None:
+    """Answers from the offline type index (TYPE_INDEX_DIR); None if it is not set or has no types for the entity."""
+    index = get_type_index()
+    if index is None or not entity_id.startswith("Q"):
+        return None
+
+    number = int(entity_id[1:])
+    direct = [int(n) for n in index.instance_of(number)] + [int(n) for n in index.subclass_of(number)]
+    if not direct:
+        return None
+
+    def describe(n: int) -> str:
+        return f"Q{n}-{index.label(n) or f'Q{n}'}"
+
+    is_a_relationships = {describe(n) for n in direct[:MAX_TYPES]}
+    context_str = f"# Context for entity {entity_id}:\n"
+    context_str += f"- Is a type of: {', '.join(sorted(is_a_relationships))}"
+
+    # Direct superclasses of the types first, then the rest of their closure
+    superclasses = []
+    for n in direct[:MAX_TYPES]:
+        for ancestor in [*index.subclass_of(n), *index.superclasses(n)]:
+            ancestor = int(ancestor)
+            if ancestor not in direct and ancestor not in superclasses:
+                superclasses.append(ancestor)
+    if superclasses:
+        labeled = [describe(n) for n in superclasses if index.label(n)][:MAX_TYPES]
+        if labeled:
+            context_str += f"\n- Which are kinds of: {', '.join(labeled)}"
+    return context_str
+
 
 async def get_entity_schema(entity_id: str) -> str:
     """
     Queries Wikidata for the most important "is a" relationships (instance of/subclass of)
-    and formats them as a clean, LLM-friendly text block.
+    and formats them as a clean, LLM-friendly text block. Uses the offline type index
+    when TYPE_INDEX_DIR is set, and the live endpoint otherwise.
     """
+    from_index = _schema_from_index(entity_id)
+    if from_index is not None:
+        return from_index
+
     query = SCHEMA_QUERY_TEMPLATE.format(entity_id=entity_id)
 
     try:
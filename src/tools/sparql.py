@@ -1,10 +1,13 @@
+import time
 from typing import Any, Dict
 
 from pydantic import BaseModel, Field
 from rdflib.plugins.sparql import prepareQuery
 
 from src.agent.prompts import sparql_prompt_template
+from src.config.config import DEFAULT_AGENT_MODEL
 from src.llm.llm_provider import llm_provider
+from src.tools.sparql_guard import find_expensive_patterns
 from src.wikidata.api import execute_sparql_query
 from src.wikidata.prefixes import ensure_prefixes
 
@@ -16,18 +19,31 @@ class SparqlGenerationResponse(BaseModel):
 
 
 def validate_sparql(query: str):
-    """Validates syntax using rdflib."""
+    """
+    Validates syntax using rdflib, then rejects queries with patterns that usually
+    time out on the endpoint (see `find_expensive_patterns`).
+    """
     try:
-        prepareQuery(query)
-        return True, "Query is valid."
+        parsed = prepareQuery(query)
     except Exception as e:
         return False, f"Syntax Error: {e}"
 
+    try:
+        issues = find_expensive_patterns(parsed)
+    except Exception as e:
+        # The guard is best effort; never block a query because the analysis failed
+        print(f"SPARQL cost guard failed: {e}")
+        issues = []
+    if issues:
+        return False, "Query rejected before execution because it would likely time out:\n- " + "\n- ".join(issues)
+    return True, "Query is valid."
+
 
 async def get_sparql_query(
         question: str,
         examples: str,
         candidates: str,
+        model: str = DEFAULT_AGENT_MODEL,
 ) -> Dict[str, Any]:
     sparql_prompt = sparql_prompt_template.format(
         examples=examples,
@@ -35,7 +51,7 @@ async def get_sparql_query(
         candidates=candidates,
     )
 
-    llm = llm_provider.get_model("nvidia/nemotron-3-nano-30b-a3b:free")
+    llm = llm_provider.get_model(model)
     structured_llm = llm.with_structured_output(SparqlGenerationResponse, method="json_mode",
                                                 include_raw=True)
 
@@ -52,15 +68,24 @@ async def get_sparql_query(
     is_valid, validation_msg = validate_sparql(final_query)
     results = None
 
+    sparql_exec_ms = 0.0
+
     if is_valid:
+        start_time = time.perf_counter()
         try:
             results = await execute_sparql_query(final_query)
         except Exception as e:
-            return {"sparql": generation.sparql, "results": None, "error": str(e)}
+            return {"sparql": generation.sparql, "results": None, "error": str(e),
+                    "sparql_exec_ms": (time.perf_counter() - start_time) * 1000}
+        sparql_exec_ms = (time.perf_counter() - start_time) * 1000
 
-    return {
+    response = {
         "sparql": generation.sparql,
         "results": results,
         "reasoning": generation.reasoning,
-        "is_valid": is_valid
+        "is_valid": is_valid,
+        "sparql_exec_ms": sparql_exec_ms
     }
+    if not is_valid:
+        response["error"] = validation_msg
+    return response
@@ -0,0 +1,221 @@
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from rdflib import BNode, Variable, URIRef, RDFS
+from rdflib.paths import Path, MulPath, SequencePath, AlternativePath, InvPath, NegatedPath, ZeroOrMore, OneOrMore
+from rdflib.plugins.sparql.parserutils import CompValue
+from rdflib.plugins.sparql.sparql import Query
+
+Triple = Tuple[Any, Any, Any]
+
+SCHEMA_LABEL = URIRef("http://schema.org/name")
+LABEL_PREDICATES = {RDFS.label, SCHEMA_LABEL, URIRef("http://www.w3.org/2004/02/skos/core#altLabel")}
+# Class membership: a class in object position matches up to millions of subjects (e.g. wdt:P31 wd:Q5)
+CLASS_PREDICATES = {URIRef("http://www.wikidata.org/prop/direct/P31"), URIRef("http://www.wikidata.org/prop/direct/P279")}
+
+
+def _is_var(term: Any) -> bool:
+    return isinstance(term, (Variable, BNode))
+
+
+def _walk(node: Any) -> Iterator[CompValue]:
+    """Yields every algebra node, skipping SERVICE blocks (the label service is evaluated per result row)."""
+    if isinstance(node, CompValue):
+        if node.name == "ServiceGraphPattern":
+            return
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, (list, tuple)):
+        for value in node:
+            yield from _walk(value)
+
+
+def _collect(algebra: CompValue) -> Tuple[List[Triple], Dict[Any, Set[Any]], Set[Any]]:
+    """
+    Returns all triple patterns, the constants that VALUES or BIND bind variables to,
+    and the variables whose language is tested (LANG(?x) in a filter or expression).
+    """
+    triples: List[Triple] = []
+    bound: Dict[Any, Set[Any]] = {}
+    lang_vars: Set[Any] = set()
+    for node in _walk(algebra):
+        if node.name == "BGP":
+            triples.extend(node.triples)
+        elif node.name == "Builtin_LANG" and _is_var(node.arg):
+            lang_vars.add(node.arg)
+        elif node.name == "values":
+            for row in node.res or []:
+                for var, term in row.items():
+                    if term is not None:
+                        bound.setdefault(var, set()).add(term)
+        elif node.name == "Extend" and not _is_var(node.expr) and not isinstance(node.expr, CompValue):
+            bound.setdefault(node.var, set()).add(node.expr)
+    return triples, bound, lang_vars
+
+
+def _anchored_terms(triples: List[Triple], bound: Dict[Any, Set[Any]]) -> Set[Any]:
+    """
+    Fixpoint of the variables reachable from a constant: a variable is anchored when it
+    shares a triple pattern with a constant or an anchored node, so the endpoint can
+    evaluate that pattern as an index lookup instead of a scan.
+    """
+    anchored = set(bound)
+
+    def is_anchored(term):
+        return not _is_var(term) or term in anchored
+
+    changed = True
+    while changed:
+        changed = False
+        for s, p, o in triples:
+            if is_anchored(s) or is_anchored(o):
+                for term in (s, p, o):
+                    if _is_var(term) and term not in anchored:
+                        anchored.add(term)
+                        changed = True
+    return anchored
+
+
+def _uris(predicate: Any) -> Iterator[URIRef]:
+    if isinstance(predicate, URIRef):
+        yield predicate
+    elif isinstance(predicate, MulPath):
+        yield from _uris(predicate.path)
+    elif isinstance(predicate, (SequencePath, AlternativePath, NegatedPath)):
+        for arg in predicate.args:
+            yield from _uris(arg)
+    elif isinstance(predicate, InvPath):
+        yield from _uris(predicate.arg)
+
+
+def _selective_terms(triples: List[Triple], bound: Dict[Any, Set[Any]]) -> Set[Any]:
+    """
+    Fixpoint of the variables with few values: those bound by VALUES or BIND, objects of
+    a constant or selective subject, and subjects of a constant or selective object
+    unless the predicate is a class membership (see CLASS_PREDICATES). Unlike
+    `_anchored_terms`, `?x wdt:P31 wd:Q5` does not make ?x selective.
+    """
+    selective = set(bound)
+
+    def is_selective(term):
+        return not _is_var(term) or term in selective
+
+    changed = True
+    while changed:
+        changed = False
+        for s, p, o in triples:
+            if is_selective(s):
+                reached = (p, o)
+            elif is_selective(o) and not any(uri in CLASS_PREDICATES for uri in _uris(p)):
+                reached = (s, p)
+            else:
+                continue
+            for term in reached:
+                if _is_var(term) and term not in selective:
+                    selective.add(term)
+                    changed = True
+    return selective
+
+
+def _transitive_paths(path: Any) -> Iterator[MulPath]:
+    if isinstance(path, MulPath):
+        if path.mod in (ZeroOrMore, OneOrMore):
+            yield path
+        yield from _transitive_paths(path.path)
+    elif isinstance(path, (SequencePath, AlternativePath, NegatedPath)):
+        for arg in path.args:
+            yield from _transitive_paths(arg)
+    elif isinstance(path, InvPath):
+        yield from _transitive_paths(path.arg)
+
+
+def _components(triples: List[Triple]) -> List[List[Triple]]:
+    """Groups triple patterns that are connected through shared variables."""
+    components: List[Tuple[Set[Any], List[Triple]]] = []
+    for triple in triples:
+        variables = {term for term in triple if _is_var(term)}
+        merged_vars, merged_triples = set(variables), [triple]
+        rest = []
+        for component_vars, component_triples in components:
+            if component_vars & variables:
+                merged_vars |= component_vars
+                merged_triples = component_triples + merged_triples
+            else:
+                rest.append((component_vars, component_triples))
+        components = rest + [(merged_vars, merged_triples)]
+    return [component_triples for _, component_triples in components]
+
+
+def _show(triple: Triple, namespace_manager=None) -> str:
+    def term(t):
+        if isinstance(t, Variable):
+            return f"?{t}"
+        return t.n3(namespace_manager) if hasattr(t, "n3") else str(t)
+
+    return " ".join(term(t) for t in triple)
+
+
+def find_expensive_patterns(query: Query) -> List[str]:
+    """
+    Statically checks a parsed query for patterns that typically time out on the
+    Wikidata endpoint. Returns one actionable message per problem, empty if none.
+
+    Flagged patterns, each only when no constant anchors it:
+    - a variable predicate (?s ?p ?o scans every statement), unless VALUES or BIND fix it
+    - a label triple matched by its text (label scans across all entities), or joined
+      and filtered with LANG() for more than a few entities (e.g. all instances of a class)
+    - a transitive path such as wdt:P279* with variables on both ends
+    - two or more triple groups that share no variable (a cross product) and are not kept
+      small by a constant subject, VALUES or BIND; a class in object position does not
+    """
+    namespace_manager = query.prologue.namespace_manager
+    triples, bound, lang_vars = _collect(query.algebra)
+    if not triples:
+        return []
+    anchored = _anchored_terms(triples, bound)
+    selective = _selective_terms(triples, bound)
+
+    def is_anchored(term):
+        return not _is_var(term) or term in anchored
+
+    issues = []
+    for s, p, o in triples:
+        pattern = _show((s, p, o), namespace_manager)
+        # A predicate bound by VALUES or BIND is judged like the constants it is bound to
+        predicates = bound.get(p, {p})
+        if _is_var(p) and not is_anchored(p) and not (is_anchored(s) or is_anchored(o)):
+            issues.append(
+                f"Triple pattern '{pattern}' has a variable predicate and no fixed subject or object, "
+                f"so it scans the whole graph. Use a concrete property (wdt:P..) or start from a known entity (wd:Q..)."
+            )
+        elif predicates & LABEL_PREDICATES and not is_anchored(s):
+            issues.append(
+                f"Triple pattern '{pattern}' looks entities up by their label text, which scans all labels. "
+                f"Use the QIDs from the candidates instead, and SERVICE wikibase:label to get labels."
+            )
+        elif predicates & LABEL_PREDICATES and o in lang_vars and _is_var(s) and s not in selective:
+            issues.append(
+                f"Triple pattern '{pattern}' joins the labels of every matching entity and filters them with LANG(), "
+                f"which times out for large classes. Use SERVICE wikibase:label {{ bd:serviceParam wikibase:language "
+                f"\"..\" }} to get labels instead."
+            )
+        elif isinstance(p, Path) and not (is_anchored(s) or is_anchored(o)):
+            for path in _transitive_paths(p):
+                issues.append(
+                    f"Property path '{path.n3(namespace_manager)}' in '{pattern}' is transitive with variables on both ends. "
+                    f"Fix one end to an entity (e.g. '?x wdt:P31/wdt:P279* wd:Q515')."
+                )
+
+    # A large group joined with a few rows (e.g. the start date of one entity) costs no more
+    # than the group alone; two large groups multiply
+    unbounded = [component for component in _components(triples)
+                 if not any(not _is_var(s) or s in selective or o in selective for s, _, o in component)]
+    if len(unbounded) > 1:
+        for component in unbounded:
+            issues.append(
+                f"The patterns '{' . '.join(_show(t, namespace_manager) for t in component)}' share no variable with the rest of "
+                f"the query and contain no fixed entity, so they form a cross product. "
+                f"Connect them to the other patterns through a shared variable."
+            )
+
+    return list(dict.fromkeys(issues))
@@ -6,6 +6,7 @@ from langchain_core.tools import tool
 from pydantic import Field, BaseModel
 
 from src.agent.prompts import validation_prompt
+from src.config.config import DEFAULT_AGENT_MODEL, DEFAULT_AUX_MODEL
 from src.llm.llm_provider import llm_provider
 from src.tools.ner import Keyword
 from src.tools.sparql import get_sparql_query
@@ -18,6 +19,7 @@ async def generate_sparql(
         candidates: str = Field(description="Pre-retrieved candidates", default=""),
         examples: str = Field(description="Pre-retrieved few-shot examples", default=""),
         ner_keywords: List[Keyword] = Field(description="Pre-retrieved NER keywords", default_factory=list),
+        model: str = Field(description="Model identifier used to generate the query", default=DEFAULT_AGENT_MODEL),
 ) -> dict:
     """
     Generates and executes a SPARQL query using the provided context.
@@ -28,6 +30,7 @@ async def generate_sparql(
         question=question,
         examples=examples,
         candidates=candidates,
+        model=model,
     )
 
     results_for_log = None
@@ -90,7 +93,8 @@ async def generate_sparql(
         "examples": str(examples),
         "generated_query": str(response.get("sparql")),
         "result": results_for_log,
-        "time": f"{execution_time:.2f}"
+        "time": f"{execution_time:.2f}",
+        "sparql_exec_ms": f"{response.get('sparql_exec_ms', 0.0):.1f}"
     }
 
     response['log_data'] = log_data
@@ -112,7 +116,7 @@ async def validate_results(question: str, results: str) -> bool:
         question=question,
         results=results
     )
-    llm = llm_provider.get_model(model_identifier="kwaipilot/kat-coder-pro:free").with_structured_output(
+    llm = llm_provider.get_model(model_identifier=DEFAULT_AUX_MODEL).with_structured_output(
         ValidationResult
     )
     response = await llm.ainvoke(prompt)
@@ -32,7 +32,8 @@ def _normalize_entity(entity: Any) -> Optional[Dict[str, Any]]:
         return {
             "id": payload.get('id'),
             "label": payload.get('value') or payload.get('label', 'N/A'),
-            "description": payload.get('description', 'No description available')
+            "description": payload.get('description', 'No description available'),
+            "score": getattr(entity, 'score', None)
         }
 
     elif isinstance(entity, dict):
@@ -41,7 +42,9 @@ def _normalize_entity(entity: Any) -> Optional[Dict[str, Any]]:
         return {
             "id": entity.get('id'),
             "label": entity.get('label', 'N/A'),
-            "description": entity.get('description', '')
+            "description": entity.get('description', ''),
+            # Similarity from rerank_candidates, if it ran
+            "score": entity.get('_score')
         }
 
     return None
@@ -54,6 +57,7 @@ def map_candidates(
     """
     Combines results.
     UPDATED: Automatically extracts the list from a QueryResponse object.
+    An entity found by both searches keeps the higher of its scores (None if unscored).
     """
 
     iterable_qdrant = qdrant_results
@@ -67,6 +71,10 @@ def map_candidates(
     for item in itertools.chain(iterable_qdrant, wikidata_api_results):
         normalized_entity = _normalize_entity(item)
         if normalized_entity and 'id' in normalized_entity:
+            previous = unique_entities.get(normalized_entity['id'])
+            if previous and (normalized_entity['score'] is None
+                             or (previous['score'] or 0.0) > normalized_entity['score']):
+                normalized_entity['score'] = previous['score']
             unique_entities[normalized_entity['id']] = normalized_entity
 
     return list(unique_entities.values())
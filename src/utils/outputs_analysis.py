@@ -1,4 +1,5 @@
 import ast
+import asyncio
 import json
 import re
 from difflib import SequenceMatcher
@@ -7,8 +8,9 @@ from typing import Set, Tuple, Dict, Any
 
 import pandas as pd
 
+from src.http_client.session import close_session
 # Import the label fetcher from your existing API module
-from src.wikidata.api import get_wikidata_labels
+from src.wikidata.labels import get_wikidata_labels_async
 
 
 class SPARQLUtils:
@@ -132,7 +134,7 @@ class AnalysisPipeline:
         self.df = pd.DataFrame()
         self.label_cache = {}  # Cache to store fetched labels
 
-    def fetch_all_labels(self, all_ids: Set[str]):
+    async def fetch_all_labels(self, all_ids: Set[str]):
         """Fetches labels for all unique IDs found in the dataset."""
         print(f"🌍 Fetching labels for {len(all_ids)} unique entities...")
         if not all_ids:
@@ -142,9 +144,8 @@ class AnalysisPipeline:
         ids_list = list(all_ids)
 
         try:
-            # Assumes get_wikidata_labels handles chunking (50 IDs limit) internally
-            # If your get_wikidata_labels is strictly for list->dict, this works directly.
-            labels = get_wikidata_labels(ids_list, language=self.lang)
+            # Chunks are fetched concurrently and repeat IDs come from the label cache
+            labels = await get_wikidata_labels_async(ids_list, language=self.lang)
             self.label_cache.update(labels)
             print(f"✅ Cached {len(self.label_cache)} labels.")
         except Exception as e:
@@ -159,6 +160,17 @@ class AnalysisPipeline:
         return ", ".join(formatted)
 
     def run(self, output_path: str):
+        """Runs the analysis in a fresh event loop; use `arun` from async code."""
+
+        async def run_and_close():
+            try:
+                await self.arun(output_path)
+            finally:
+                await close_session()
+
+        asyncio.run(run_and_close())
+
+    async def arun(self, output_path: str):
         print(f"🚀 Starting Analysis...")
 
         # 1. Load Data
@@ -190,7 +202,7 @@ class AnalysisPipeline:
             all_unique_ids.update(SPARQLUtils.extract_ids_from_text(gen_q))
             all_unique_ids.update(SPARQLUtils.extract_ids_from_text(gold_q))
 
-        self.fetch_all_labels(all_unique_ids)
+        await self.fetch_all_labels(all_unique_ids)
 
         # 3. Calculate ID Metrics (With Label Formatting)
         def calc_id_metrics(row):
@@ -0,0 +1,22 @@
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@contextmanager
+def stopwatch(timings: Optional[Dict[str, float]], key: str):
+    """Adds the elapsed wall-clock time of the block, in milliseconds, to `timings[key]`."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[key] = timings.get(key, 0.0) + (time.perf_counter() - start_time) * 1000
+
+
+async def timed(awaitable: Awaitable[T], timings: Optional[Dict[str, float]], key: str) -> T:
+    """Awaits `awaitable` and records its duration like `stopwatch`."""
+    with stopwatch(timings, key):
+        return await awaitable
@@ -1,59 +1,98 @@
 import asyncio
-import sys
-import time
+import json
+import os
+import re
 from typing import Any, List, Dict
 
 import aiohttp
 import requests
 
-from src.http_client.session import get_session
+from src.cache.sqlite_cache import SqliteCache
+from src.cassette.cassette import cassette
+from src.http_client.rate_limiter import rate_limiter, parse_retry_after
+from src.http_client.session import get_session, request_timeout, USER_AGENT
+from src.http_client.single_flight import SingleFlight
+from src.wikidata.sparql_backend import get_sparql_backend, SparqlBackend
 
-USER_AGENT = "MyWikidataBot/1.0 (my-project-url.com; author)"
+WIKIDATA_API_URL = "https://www.wikidata.org/w/api.php"
 
-_last_request_time = 0
-MIN_DELAY = 1.0
+# Results of SPARQL queries, shared by all languages, models and benchmark reruns
+sparql_cache = SqliteCache("sparql", ttl=7 * 24 * 3600, negative_ttl=24 * 3600, max_entries=200_000)
+# wbsearchentities responses, keyed by all request parameters (so per keyword, type and language)
+search_cache = SqliteCache("search", ttl=7 * 24 * 3600, negative_ttl=24 * 3600, max_entries=500_000)
 
+# Concurrent identical API requests and queries share one call and its result
+in_flight = SingleFlight()
 
-async def _rate_limit():
-    """Asynchronously ensure a minimum delay between requests."""
-    global _last_request_time
-    now = time.time()
-    elapsed = now - _last_request_time
-    if elapsed < MIN_DELAY:
-        await asyncio.sleep(MIN_DELAY - elapsed)
-    _last_request_time = time.time()
+# String literals and IRIs, whose whitespace is significant
+_SPARQL_VERBATIM = re.compile(r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|<[^<>\s]*>')
 
+# Bindings kept per query; SELECT queries are capped to this LIMIT before they are sent
+MAX_RESULTS = int(os.getenv("SPARQL_MAX_RESULTS", "10"))
 
-async def fetch_wikidata(params: dict) -> dict | None:
+_SELECT_QUERY = re.compile(r'^\s*(?:(?:PREFIX\s+[\w.-]*:\s*<[^>]*>|BASE\s+<[^>]*>)\s*)*SELECT\b', re.IGNORECASE)
+_COMMENT_LINE = re.compile(r'^\s*#.*$', re.MULTILINE)
+_LIMIT_CLAUSE = re.compile(r'\bLIMIT\s+(\d+)', re.IGNORECASE)
+_TRAILING_VALUES = re.compile(r'\bVALUES\s*(?:\?\w+|\([^)]*\))\s*\{[^{}]*\}\s*$', re.IGNORECASE)
+
+
+async def fetch_wikidata(params: dict, cache: SqliteCache | None = None) -> dict | None:
     """
     Asynchronously fetches data from the Wikidata API using aiohttp.
 
     Args:
         params: A dictionary of parameters for the API request.
+        cache: Optional persistent cache for the responses of this kind of request.
 
     Returns:
         A dictionary with the JSON response or None on error.
     """
+    key = ("wikidata_api", json.dumps(params, sort_keys=True))
+    return await in_flight.do(
+        key, lambda: cassette.through("wikidata_api", params, lambda: _cached_fetch_wikidata(params, cache))
+    )
+
+
+async def _cached_fetch_wikidata(params: dict, cache: SqliteCache | None) -> dict | None:
+    if cache is None:
+        return await _fetch_wikidata(params)
+
+    url = os.getenv("WIKIDATA_API_URL", WIKIDATA_API_URL)
+    # Responses of another API (e.g. the stand-in server) must not mix with the real ones
+    key = cache.make_key(params) if url == WIKIDATA_API_URL else cache.make_key(url, params)
+    found, response = cache.get(key)
+    if found:
+        return response
+
+    response = await _fetch_wikidata(params)
+    # Failed requests and API errors are not cached
+    if response is not None and "error" not in response:
+        cache.put(key, response, negative=not response.get("search"))
+    return response
+
+
+async def _fetch_wikidata(params: dict) -> dict | None:
     session = get_session()
 
-    url = "https://www.wikidata.org/w/api.php"
+    url = os.getenv("WIKIDATA_API_URL", WIKIDATA_API_URL)
     retries = 3
     delay = 2
 
     for attempt in range(retries):
-        await _rate_limit()
+        await rate_limiter.acquire("wikidata_api", url)
         try:
             async with session.get(
                     url,
                     params=params,
                     headers={"User-Agent": USER_AGENT},
-                    timeout=15
+                    timeout=request_timeout(15)
             ) as response:
 
                 if response.status == 429:
-                    retry_after = int(response.headers.get("Retry-After", delay))
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"), delay)
                     print(f"Rate limited. Retrying after {retry_after} seconds...")
-                    await asyncio.sleep(retry_after)
+                    # Pauses every request to this host, not just this one
+                    rate_limiter.penalize("wikidata_api", url, retry_after)
                     delay *= 2
                     continue
 
@@ -86,7 +125,7 @@ async def search_wikidata(keyword: str, type: str, lang: str) -> list:
         "limit": 5
     }
     results = []
-    wikidata_result = await fetch_wikidata(params)
+    wikidata_result = await fetch_wikidata(params, cache=search_cache)
     if wikidata_result and "search" in wikidata_result:
         results.extend(wikidata_result["search"])
     else:
@@ -94,59 +133,79 @@ async def search_wikidata(keyword: str, type: str, lang: str) -> list:
     return results
 
 
-async def execute_sparql_query(query: str, retries: int = 3, delay: int = 5) -> Any:
+async def execute_sparql_query(query: str, retries: int = 3, delay: int = 5, max_results: int = MAX_RESULTS) -> Any:
     """
-    Asynchronously executes a SPARQL query against the Wikidata endpoint using aiohttp.
-    """
-    session = get_session()
-
-    endpoint_url = "https://query.wikidata.org/sparql"
-
-    params = {
-        "query": query,
-        "format": "json"
-    }
-
-    for attempt in range(retries):
-        try:
-            await _rate_limit()
-            async with session.get(
-                    endpoint_url,
-                    params=params,
-                    headers={'Accept': 'application/sparql-results+json', 'User-Agent': USER_AGENT},
-                    timeout=30
-            ) as response:
+    Asynchronously executes a SPARQL query on the configured backend (by default the
+    Wikidata endpoint, see `get_sparql_backend`).
 
-                if response.status == 429 or response.status == 504:
-                    print(f"⚠️ Query timed out or rate limited (HTTP {response.status}). "
-                          f"Retrying in {delay} seconds...", file=sys.stderr)
-                    await asyncio.sleep(delay)
-                    delay *= 2
-                    continue
-
-                response.raise_for_status()
-                response_json = await response.json()
-
-                if "results" in response_json and "bindings" in response_json["results"]:
-                    bindings = response_json["results"]["bindings"]
-                    return bindings[:10] if bindings else []
-
-                elif "boolean" in response_json:
-                    return response_json["boolean"]
-
-                return []
+    SELECT queries without a LIMIT, or with one above `max_results`, are rewritten to
+    LIMIT `max_results`, and at most `max_results` bindings are read from the response.
+    """
+    query = cap_limit(query, max_results)
+    backend = get_sparql_backend()
+    key = ("sparql", backend.name, normalize_query(query), max_results)
+    return await in_flight.do(
+        key, lambda: cassette.through(
+            "sparql", [backend.name, query, max_results],
+            lambda: _cached_sparql_query(backend, query, retries, delay, max_results)
+        )
+    )
+
+
+def cap_limit(query: str, max_results: int) -> str:
+    """
+    Sets the outer LIMIT of a SELECT query to at most `max_results`.
 
-        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            print(f"SPARQL query error on attempt {attempt + 1}: {e}", file=sys.stderr)
-            if attempt < retries - 1:
-                await asyncio.sleep(delay)
-                delay *= 2
-            else:
-                return None
-        except Exception as e:
-            print(f"Wikidata error in executing query: {e}")
-            return None
-    return None
+    Only the solution modifiers after the last closing brace are touched, so LIMITs of
+    subqueries stay as they are. ASK/CONSTRUCT/DESCRIBE queries and queries ending in a
+    VALUES block are returned unchanged.
+    """
+    code = _COMMENT_LINE.sub("", query)
+    if not _SELECT_QUERY.match(code) or _TRAILING_VALUES.search(code):
+        return query
+
+    body_end = query.rfind("}")
+    if body_end < 0:
+        return query
+    modifiers = query[body_end + 1:]
+
+    match = _LIMIT_CLAUSE.search(modifiers)
+    if match is None:
+        return query.rstrip() + f"\nLIMIT {max_results}"
+    if int(match.group(1)) <= max_results:
+        return query
+    start = body_end + 1 + match.start(1)
+    return query[:start] + str(max_results) + query[body_end + 1 + match.end(1):]
+
+
+def normalize_query(query: str) -> str:
+    """Collapses whitespace outside literals and IRIs, so formatting differences share a cache entry."""
+    parts = []
+    position = 0
+    for match in _SPARQL_VERBATIM.finditer(query):
+        parts.append(re.sub(r"\s+", " ", query[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(re.sub(r"\s+", " ", query[position:]))
+    return "".join(parts).strip()
+
+
+async def _cached_sparql_query(backend: SparqlBackend, query: str, retries: int, delay: int, max_results: int) -> Any:
+    if not backend.persistent_cache:
+        return await backend.execute(query, max_results, retries, delay)
+
+    key = sparql_cache.make_key(backend.cache_namespace, normalize_query(query), max_results)
+    found, result = sparql_cache.get(key)
+    if found:
+        return result
+
+    outcome = await backend.execute_outcome(query, max_results, retries, delay)
+    result = outcome.result
+    # None means the request failed; only real answers are cached, empty ones with the negative TTL.
+    # Answers of a fallback backend are not cached under this backend's namespace.
+    if result is not None and outcome.cacheable:
+        sparql_cache.put(key, result, negative=result == [])
+    return result
 
 
 # print(asyncio.run(execute_sparql_query(
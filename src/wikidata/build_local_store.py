@@ -0,0 +1,150 @@
+import argparse
+import bz2
+import gzip
+import json
+import re
+import time
+from pathlib import Path
+from collections import Counter
+from typing import Set
+
+from tqdm import tqdm
+
+from src.dataset.qald_10 import QALD_JSON_PATH
+from src.wikidata.sparql_backend import DEFAULT_LOCAL_STORE_PATH
+
+ENTITY_PREFIX = "<http://www.wikidata.org/entity/"
+LABEL_PREDICATES = {
+    "<http://www.w3.org/2000/01/rdf-schema#label>",
+    "<http://schema.org/description>",
+}
+# Property metadata the neighbor and schema queries rely on (e.g. ?prop wikibase:directClaim ?p)
+PROPERTY_PREDICATES = LABEL_PREDICATES | {
+    "<http://wikiba.se/ontology#directClaim>",
+    "<http://wikiba.se/ontology#propertyType>",
+}
+TYPE_PREDICATES = {
+    "<http://www.wikidata.org/prop/direct/P31>",
+    "<http://www.wikidata.org/prop/direct/P279>",
+}
+_QALD_ENTITY = re.compile(r"\b(?:wd|wdt|p|ps|pq):([QP]\d+)\b|/entity/([QP]\d+)")
+_LANGUAGE_TAG = re.compile(r'"@([\w-]+) \.$')
+
+
+def get_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Writes the QALD-10 subset of a Wikidata truthy N-Triples dump for the local SPARQL backend."
+    )
+    parser.add_argument('--input_file', type=str, required=True,
+                        help='path to latest-truthy.nt.bz2 (or .gz)')
+    parser.add_argument('--output_file', type=str, default=DEFAULT_LOCAL_STORE_PATH,
+                        help='output N-Triples file (.nt or .nt.gz)')
+    parser.add_argument('--qald_json', type=str, default=QALD_JSON_PATH, help='QALD-10 json with the gold queries')
+    parser.add_argument('--languages', type=str, nargs='+', default=["en", "de", "ru", "zh", "mk"],
+                        help='languages of the labels and descriptions to keep')
+    parser.add_argument('--max_incoming_per_seed', type=int, default=1000,
+                        help='statements kept per QALD entity and property that point at the entity; hubs such as '
+                             'Q5 (human) are the object of millions of statements that an in-memory store cannot load')
+    parser.add_argument('--num_lines_read', type=int, default=-1,
+                        help='Terminate after num_lines_read lines are read. Useful for debugging.')
+    return parser
+
+
+def qald_entities(qald_json: str | Path) -> Set[str]:
+    """IDs of every entity and property used in the QALD-10 gold queries."""
+    with open(qald_json, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    ids = set()
+    for question in data.get("questions", []):
+        sparql = question.get("query", {}).get("sparql", "")
+        for match in _QALD_ENTITY.finditer(sparql):
+            ids.add(match.group(1) or match.group(2))
+    return ids
+
+
+def _open_dump(input_file: Path):
+    if input_file.suffix == ".bz2":
+        return bz2.open(input_file, "rt", encoding="utf-8")
+    if input_file.suffix == ".gz":
+        return gzip.open(input_file, "rt", encoding="utf-8")
+    return open(input_file, "r", encoding="utf-8")
+
+
+def _entity_id(term: str) -> str | None:
+    if term.startswith(ENTITY_PREFIX):
+        return term[len(ENTITY_PREFIX):-1]
+    return None
+
+
+def _keep_literal(line: str, languages: Set[str]) -> bool:
+    match = _LANGUAGE_TAG.search(line.rstrip())
+    return match is None or match.group(1) in languages
+
+
+def _scan(input_file: Path, num_lines_read: int, description: str):
+    with _open_dump(input_file) as f:
+        for i, line in enumerate(tqdm(f, description, unit=" lines")):
+            if 0 < num_lines_read <= i:
+                break
+            parts = line.split(" ", 2)
+            if len(parts) == 3:
+                yield line, parts[0], parts[1], parts[2]
+
+
+def main(args):
+    start = time.time()
+    input_file = Path(args.input_file)
+    assert input_file.exists(), f"Input file {input_file} does not exist"
+    output_file = Path(args.output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    languages = set(args.languages)
+
+    seeds = qald_entities(args.qald_json)
+    print(f"{len(seeds)} entities and properties in the QALD-10 gold queries.")
+
+    # Pass 1: every statement about a QALD entity, the first statements per property pointing at
+    # one (see --max_incoming_per_seed), plus all property metadata
+    neighbors: Set[str] = set()
+    incoming = Counter()
+    opener = gzip.open if output_file.suffix == ".gz" else open
+    kept = 0
+    with opener(output_file, "wt", encoding="utf-8") as out:
+        for line, subject, predicate, obj in _scan(input_file, args.num_lines_read, "Pass 1/2"):
+            subject_id = _entity_id(subject)
+            object_id = _entity_id(obj.rstrip(" .\n"))
+            if subject_id and subject_id.startswith("P") and predicate in PROPERTY_PREDICATES:
+                keep = predicate not in LABEL_PREDICATES or _keep_literal(line, languages)
+            elif subject_id in seeds:
+                keep = predicate not in LABEL_PREDICATES or _keep_literal(line, languages)
+                if keep and object_id:
+                    neighbors.add(object_id)
+            elif object_id in seeds:
+                incoming[object_id, predicate] += 1
+                keep = incoming[object_id, predicate] <= args.max_incoming_per_seed
+                if keep:
+                    neighbors.add(subject_id)
+            else:
+                keep = False
+            if keep:
+                out.write(line)
+                kept += 1
+
+        # Pass 2: labels, descriptions and types of the neighbors, so label service and schema queries work
+        neighbors -= seeds
+        neighbors.discard(None)
+        capped = sum(1 for count in incoming.values() if count > args.max_incoming_per_seed)
+        print(f"Kept {kept} triples ({capped} entity/property pairs with incoming statements capped); "
+              f"adding labels and types of {len(neighbors)} neighbors.")
+        for line, subject, predicate, obj in _scan(input_file, args.num_lines_read, "Pass 2/2"):
+            if _entity_id(subject) not in neighbors:
+                continue
+            if (predicate in LABEL_PREDICATES and _keep_literal(line, languages)) or predicate in TYPE_PREDICATES:
+                out.write(line)
+                kept += 1
+
+    print(f"Wrote {kept} triples to '{output_file}' in {time.time() - start:.0f}s")
+
+
+if __name__ == "__main__":
+    main(get_arg_parser().parse_args())
@@ -0,0 +1,202 @@
+import argparse
+import json
+import tempfile
+import time
+from array import array
+from pathlib import Path
+from typing import Iterator, List
+
+import numpy as np
+import ujson
+from tqdm import tqdm
+
+from src.wikidata.neighbor_index import DEFAULT_NEIGHBORS_PER_ITEM, entity_key, find
+
+DEFAULT_NEIGHBOR_INDEX_DIR = "../neighbor_index"
+# Languages of the labels table written by the dump worker
+LABEL_COLUMNS = {"en": "label_en", "de": "label_de", "ru": "label_ru", "zh": "label_zh", "mk": "label_mk"}
+
+
+def get_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Builds the memory-mapped neighbor index used by enrich_candidates from the processed dump."
+    )
+    parser.add_argument('--processed_dir', type=str, required=True,
+                        help='out_dir of preprocess_dump.py (with the labels, popularity and edges tables)')
+    parser.add_argument('--output_dir', type=str, default=DEFAULT_NEIGHBOR_INDEX_DIR)
+    parser.add_argument('--neighbors_per_item', type=int, default=2 * DEFAULT_NEIGHBORS_PER_ITEM,
+                        help='edges kept per item and direction; more than are shown, since edges '
+                             'without labels in the question language are skipped')
+    parser.add_argument('--chunk_edges', type=int, default=5_000_000,
+                        help='edges buffered before their scores are looked up and the chunk is flushed')
+    parser.add_argument('--partitions', type=int, default=16,
+                        help='temporary files the incoming edges are spread over by target item, '
+                             'so that each can be reduced in memory')
+    return parser
+
+
+def read_table(processed_dir: Path, table_name: str) -> Iterator[dict]:
+    files = sorted((processed_dir / table_name).glob("*.jsonl"), key=lambda path: int(path.stem))
+    for path in tqdm(files, f"Reading {table_name}", unit=" files"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                yield ujson.loads(line)
+
+
+class Popularity:
+    """Sitelink counts indexed by Q number, the popularity heuristic of the neighbor ranking."""
+
+    def __init__(self):
+        self.values = np.zeros(1 << 24, dtype=np.int32)
+
+    def set(self, number: int, sitelinks: int):
+        if number >= len(self.values):
+            grown = np.zeros(max(number + 1, 2 * len(self.values)), dtype=np.int32)
+            grown[:len(self.values)] = self.values
+            self.values = grown
+        self.values[number] = sitelinks
+
+    def get(self, numbers: np.ndarray) -> np.ndarray:
+        known = numbers < len(self.values)
+        return np.where(known, self.values[np.where(known, numbers, 0)], 0)
+
+
+def top_k_per_item(items: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` best-scored rows of every item, ordered by item and then score."""
+    order = np.lexsort((-scores, items))
+    sorted_items = items[order]
+    starts = np.flatnonzero(np.r_[True, sorted_items[1:] != sorted_items[:-1]])
+    lengths = np.diff(np.r_[starts, len(sorted_items)])
+    rank = np.arange(len(sorted_items)) - np.repeat(starts, lengths)
+    return order[rank < k]
+
+
+class EdgeSelection:
+    """
+    Selects the top `k` edges per item and direction in one pass over the edges table.
+
+    Every entity's statements are in one row, so its outgoing top k is picked when its
+    chunk is flushed. Incoming edges of an item come from many rows; they are spread
+    over `partitions` temporary files by item and each file is reduced once at the end.
+    """
+
+    def __init__(self, popularity: Popularity, k: int, chunk_edges: int, partitions: int, tmp_dir: Path):
+        self.popularity = popularity
+        self.k = k
+        self.chunk_edges = chunk_edges
+        self.partition_files = [tmp_dir / f"incoming_{i}.bin" for i in range(partitions)]
+        self.outgoing: List[np.ndarray] = []  # rows of item, property, value
+        self.subjects, self.pids, self.values = array("i"), array("i"), array("i")
+
+    def add_row(self, subject: int, claims: List[List[str]]):
+        pairs = {(int(pid[1:]), int(value[1:])) for pid, value in claims}
+        self.subjects.extend([subject] * len(pairs))
+        self.pids.extend(pid for pid, _ in pairs)
+        self.values.extend(value for _, value in pairs)
+        if len(self.subjects) >= self.chunk_edges:
+            self.flush()
+
+    def flush(self):
+        subjects, pids, values = (np.frombuffer(a, dtype=np.int32).copy() for a in (self.subjects, self.pids, self.values))
+        self.subjects, self.pids, self.values = array("i"), array("i"), array("i")
+        if not len(subjects):
+            return
+
+        top = top_k_per_item(subjects, self.popularity.get(values), self.k)
+        self.outgoing.append(np.stack([subjects[top], pids[top], values[top]], axis=1))
+
+        incoming = np.stack([values, pids, subjects, self.popularity.get(subjects)], axis=1).astype(np.int32)
+        partition = values % len(self.partition_files)
+        for i, path in enumerate(self.partition_files):
+            with open(path, "ab") as f:
+                incoming[partition == i].tofile(f)
+
+    def finish(self):
+        """Returns the outgoing and incoming (item, property, other entity) rows, sorted by item and score."""
+        self.flush()
+        outgoing = np.concatenate(self.outgoing) if self.outgoing else np.zeros((0, 3), dtype=np.int32)
+
+        incoming = []
+        for path in tqdm(self.partition_files, "Reducing incoming edges"):
+            if path.exists():
+                rows = np.fromfile(path, dtype=np.int32).reshape(-1, 4)
+                incoming.append(rows[top_k_per_item(rows[:, 0], rows[:, 3], self.k), :3])
+                path.unlink()
+        incoming = np.concatenate(incoming) if incoming else np.zeros((0, 3), dtype=np.int32)
+
+        # Stable sorts keep the score order within every item
+        return (outgoing[np.argsort(outgoing[:, 0], kind="stable")],
+                incoming[np.argsort(incoming[:, 0], kind="stable")])
+
+
+def _csr(edges: np.ndarray, items: np.ndarray):
+    offsets = np.r_[np.searchsorted(edges[:, 0], items), len(edges)].astype(np.int64)
+    return offsets, edges[:, 1:3]
+
+
+def write_labels(processed_dir: Path, output_dir: Path, label_keys: np.ndarray):
+    """Writes the labels of `label_keys` from the labels table in the layout read by `IndexLabels`."""
+    labels = {language: [None] * len(label_keys) for language in LABEL_COLUMNS}
+    for row in read_table(processed_dir, "labels"):
+        position = find(label_keys, entity_key(row["qid"]))
+        if position >= 0:
+            for language, column in LABEL_COLUMNS.items():
+                labels[language][position] = row.get(column)
+
+    np.save(output_dir / "label_keys.npy", label_keys)
+    for language, values in labels.items():
+        offsets = np.zeros(len(label_keys) + 1, dtype=np.int64)
+        with open(output_dir / f"labels_{language}.bin", "wb") as blob:
+            position = 0
+            for i, value in enumerate(values):
+                if value:
+                    encoded = value.encode("utf-8")
+                    blob.write(encoded)
+                    position += len(encoded)
+                offsets[i + 1] = position
+        np.save(output_dir / f"labels_{language}.offsets.npy", offsets)
+
+
+def main(args):
+    start = time.time()
+    processed_dir = Path(args.processed_dir)
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    k = args.neighbors_per_item
+
+    popularity = Popularity()
+    for row in read_table(processed_dir, "popularity"):
+        if row["qid"].startswith("Q"):
+            popularity.set(int(row["qid"][1:]), row["sitelinks"])
+
+    with tempfile.TemporaryDirectory(dir=output_dir) as tmp_dir:
+        selection = EdgeSelection(popularity, k, args.chunk_edges, args.partitions, Path(tmp_dir))
+        for row in read_table(processed_dir, "edges"):
+            if row["qid"].startswith("Q"):
+                selection.add_row(int(row["qid"][1:]), row["claims"])
+        outgoing, incoming = selection.finish()
+
+    items = np.union1d(outgoing[:, 0], incoming[:, 0]).astype(np.int64)
+    out_offsets, out_edges = _csr(outgoing, items)
+    in_offsets, in_edges = _csr(incoming, items)
+    print(f"Indexed {len(out_edges)} outgoing and {len(in_edges)} incoming edges of {len(items)} items.")
+
+    # Labels of everything the index can print: items, their neighbors and the properties
+    label_keys = np.unique(np.concatenate([
+        items, out_edges[:, 1], in_edges[:, 1], -out_edges[:, 0].astype(np.int64), -in_edges[:, 0].astype(np.int64)
+    ]))
+
+    np.save(output_dir / "items.npy", items)
+    np.save(output_dir / "out_offsets.npy", out_offsets)
+    np.save(output_dir / "out_edges.npy", out_edges)
+    np.save(output_dir / "in_offsets.npy", in_offsets)
+    np.save(output_dir / "in_edges.npy", in_edges)
+    write_labels(processed_dir, output_dir, label_keys)
+    with open(output_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"languages": list(LABEL_COLUMNS), "neighbors_per_item": k}, f)
+
+    print(f"Wrote the neighbor index to '{output_dir}' in {time.time() - start:.0f}s")
+
+
+if __name__ == "__main__":
+    main(get_arg_parser().parse_args())
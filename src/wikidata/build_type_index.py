@@ -0,0 +1,103 @@
+import argparse
+import json
+import time
+from array import array
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+from tqdm import tqdm
+
+from src.wikidata.build_neighbor_index import LABEL_COLUMNS, read_table, write_labels
+
+DEFAULT_TYPE_INDEX_DIR = "../type_index"
+
+
+def get_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Builds the memory-mapped instance-of/subclass-of index used by get_entity_schema "
+                    "from the processed dump."
+    )
+    parser.add_argument('--processed_dir', type=str, required=True,
+                        help='out_dir of preprocess_dump.py (with the labels and edges tables)')
+    parser.add_argument('--output_dir', type=str, default=DEFAULT_TYPE_INDEX_DIR)
+    parser.add_argument('--closure_min_instances', type=int, default=100,
+                        help='precompute the superclass closure of classes with at least this many '
+                             'direct instances and subclasses')
+    return parser
+
+
+def dense_csr(subjects: np.ndarray, values: np.ndarray, size: int):
+    """CSR rows indexed directly by subject number: row n is values[offsets[n]:offsets[n + 1]]."""
+    order = np.argsort(subjects, kind="stable")
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(subjects, minlength=size), out=offsets[1:])
+    return offsets, values[order].astype(np.int32)
+
+
+def superclass_closure(offsets: np.ndarray, values: np.ndarray, number: int) -> np.ndarray:
+    """All classes reachable from `number` over P279, without `number` itself (the graph has cycles)."""
+    seen = set()
+    queue = deque(values[offsets[number]:offsets[number + 1]].tolist())
+    while queue:
+        parent = queue.popleft()
+        if parent in seen or parent == number:
+            continue
+        seen.add(parent)
+        if parent + 1 < len(offsets):
+            queue.extend(values[offsets[parent]:offsets[parent + 1]].tolist())
+    return np.array(sorted(seen), dtype=np.int32)
+
+
+def main(args):
+    start = time.time()
+    processed_dir = Path(args.processed_dir)
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Q numbers fit in 32 bits; array keeps the ~100M P31 edges compact while reading
+    edges = {pid: (array("i"), array("i")) for pid in ("P31", "P279")}
+    for row in read_table(processed_dir, "edges"):
+        if not row["qid"].startswith("Q"):
+            continue
+        subject = int(row["qid"][1:])
+        for pid, value in row["claims"]:
+            if pid in edges:
+                edges[pid][0].append(subject)
+                edges[pid][1].append(int(value[1:]))
+
+    p31_subjects, p31_values = (np.frombuffer(a, dtype=np.int32) for a in edges["P31"])
+    p279_subjects, p279_values = (np.frombuffer(a, dtype=np.int32) for a in edges["P279"])
+    size = int(max([0, *(a.max() + 1 for a in (p31_subjects, p31_values, p279_subjects, p279_values) if len(a))]))
+    p31_offsets, p31_csr = dense_csr(p31_subjects, p31_values, size)
+    p279_offsets, p279_csr = dense_csr(p279_subjects, p279_values, size)
+    print(f"Indexed {len(p31_csr)} instance-of and {len(p279_csr)} subclass-of edges.")
+
+    counts = np.bincount(p31_values, minlength=size) + np.bincount(p279_values, minlength=size)
+    closure_classes = np.flatnonzero(counts >= args.closure_min_instances).astype(np.int64)
+    closure_offsets = np.zeros(len(closure_classes) + 1, dtype=np.int64)
+    closures = []
+    for i, number in enumerate(tqdm(closure_classes, "Superclass closures")):
+        closures.append(superclass_closure(p279_offsets, p279_csr, int(number)))
+        closure_offsets[i + 1] = closure_offsets[i] + len(closures[-1])
+    closure_values = np.concatenate(closures) if closures else np.zeros(0, dtype=np.int32)
+    print(f"Precomputed the superclasses of {len(closure_classes)} frequent classes.")
+
+    np.save(output_dir / "p31_offsets.npy", p31_offsets)
+    np.save(output_dir / "p31_values.npy", p31_csr)
+    np.save(output_dir / "p279_offsets.npy", p279_offsets)
+    np.save(output_dir / "p279_values.npy", p279_csr)
+    np.save(output_dir / "closure_classes.npy", closure_classes)
+    np.save(output_dir / "closure_offsets.npy", closure_offsets)
+    np.save(output_dir / "closure_values.npy", closure_values)
+    # Labels of every class an entity can be described with
+    label_keys = np.unique(np.concatenate([p31_csr, p279_csr, closure_values]).astype(np.int64))
+    write_labels(processed_dir, output_dir, label_keys)
+    with open(output_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"languages": list(LABEL_COLUMNS), "closure_min_instances": args.closure_min_instances}, f)
+
+    print(f"Wrote the type index to '{output_dir}' in {time.time() - start:.0f}s")
+
+
+if __name__ == "__main__":
+    main(get_arg_parser().parse_args())
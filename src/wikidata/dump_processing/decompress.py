@@ -0,0 +1,183 @@
+import bz2
+import gzip
+import io
+import multiprocessing
+from collections import deque
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+BLOCK_MAGIC = 0x314159265359  # start of a bz2 block (pi)
+END_MAGIC = 0x177245385090  # end of a bz2 stream (sqrt(pi))
+MAGIC_BITS = 48
+
+SCAN_CHUNK_SIZE = 32 * 1024 * 1024
+# Blocks decompressed or waiting per worker; bounds the memory of the reader
+PENDING_BLOCKS_PER_PROCESS = 4
+# Ranges joined to get past a false marker before giving up
+MAX_MERGED_RANGES = 4
+
+
+def _magic_patterns(magic: int) -> List[Tuple[int, bytes]]:
+    """
+    For every bit alignment, the 5 bytes that lie fully inside the magic number when it
+    starts at that bit of a byte; they are searched with bytes.find and then verified.
+    """
+    patterns = []
+    for shift in range(8):
+        window = (magic << (8 - shift)).to_bytes(7, "big")
+        patterns.append((shift, window[1:6]))
+    return patterns
+
+
+_PATTERNS = {magic: _magic_patterns(magic) for magic in (BLOCK_MAGIC, END_MAGIC)}
+
+
+def _find_markers(data: bytes, start: int, end: int) -> List[Tuple[int, int]]:
+    """(bit offset in data, magic) of every block/stream-end marker starting in data[start:end]."""
+    markers = []
+    for magic, patterns in _PATTERNS.items():
+        for shift, core in patterns:
+            position = data.find(core, start + 1, end + 5)
+            while position != -1:
+                window_start = position - 1
+                window = data[window_start:window_start + 7]
+                if len(window) == 7 and (int.from_bytes(window, "big") >> (8 - shift)) & ((1 << MAGIC_BITS) - 1) == magic:
+                    markers.append((window_start * 8 + shift, magic))
+                position = data.find(core, position + 1, end + 5)
+    markers.sort()
+    return markers
+
+
+def iter_block_ranges(input_file: Path) -> Iterator[Tuple[int, int]]:
+    """
+    Bit ranges [start, end) of the compressed blocks of a bz2 file, in order, for
+    single- and multi-stream files. Each range starts at a block magic and ends at the
+    next block magic or stream end marker.
+    """
+    with open(input_file, "rb") as f:
+        buffer = b""
+        base = 0  # byte offset of buffer[0] in the file
+        scanned = 0  # bytes of the buffer already searched for markers
+        block_start = None
+        while True:
+            chunk = f.read(SCAN_CHUNK_SIZE)
+            buffer += chunk
+            # Markers may cross the end of the buffer; leave the last 6 bytes for the next round
+            scan_end = len(buffer) if not chunk else len(buffer) - 6
+            for bit, magic in _find_markers(buffer, scanned, scan_end):
+                if block_start is not None and base * 8 + bit > block_start:
+                    yield block_start, base * 8 + bit
+                block_start = base * 8 + bit if magic == BLOCK_MAGIC else None
+            scanned = max(scanned, scan_end)
+            if not chunk:
+                return
+
+            # Drop what no pending range needs
+            keep_from = (block_start - base * 8) // 8 if block_start is not None else scanned
+            keep_from = min(keep_from, scanned)
+            buffer = buffer[keep_from:]
+            base += keep_from
+            scanned -= keep_from
+
+
+def read_bits(input_file: Path, start: int, end: int) -> bytes:
+    """Bytes covering the bit range [start, end) of a file."""
+    with open(input_file, "rb") as f:
+        f.seek(start // 8)
+        return f.read((end + 7) // 8 - start // 8)
+
+
+def decompress_block(data: bytes, start_bit: int, end_bit: int) -> bytes:
+    """
+    Decompresses the block in bits [start_bit, end_bit) of `data` by wrapping it in a
+    stream of its own: a 'BZh9' header, the block, and an end marker whose stream CRC is
+    the block CRC (the 32 bits after the block magic).
+    """
+    length = end_bit - start_bit
+    value = int.from_bytes(data, "big") >> (len(data) * 8 - end_bit)
+    block = value & ((1 << length) - 1)
+    crc = (block >> (length - MAGIC_BITS - 32)) & 0xFFFFFFFF
+    stream = (((block << MAGIC_BITS) | END_MAGIC) << 32) | crc
+    bits = length + MAGIC_BITS + 32
+    padding = -bits % 8
+    return bz2.decompress(b"BZh9" + (stream << padding).to_bytes((bits + padding) // 8, "big"))
+
+
+def _decompress_range(input_file: Path, start: int, end: int) -> bytes | None:
+    data = read_bits(input_file, start, end)
+    try:
+        return decompress_block(data, start % 8, start % 8 + end - start)
+    except (OSError, ValueError, EOFError):
+        # A false marker inside compressed data split a block; the reader merges the pieces
+        return None
+
+
+def parallel_bz2_chunks(input_file: Path, processes: int) -> Iterator[bytes]:
+    """Decompressed contents of a bz2 file, in order, with its blocks decompressed by a process pool."""
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        pending = deque()
+        ranges = iter_block_ranges(input_file)
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < processes * PENDING_BLOCKS_PER_PROCESS:
+                block_range = next(ranges, None)
+                if block_range is None:
+                    exhausted = True
+                    break
+                pending.append((block_range, pool.apply_async(_decompress_range, (input_file, *block_range))))
+            if not pending:
+                return
+
+            (start, end), result = pending.popleft()
+            data = result.get()
+            merged = 1
+            while data is None:
+                if merged >= MAX_MERGED_RANGES or (exhausted and not pending):
+                    raise OSError(f"Could not decompress the bz2 block at bit {start} of {input_file}; "
+                                  f"read it with --decompress_processes 1 instead.")
+                if not pending:
+                    block_range = next(ranges, None)
+                    if block_range is None:
+                        exhausted = True
+                        continue
+                    pending.append((block_range, None))
+                (_, end), _ = pending.popleft()
+                merged += 1
+                data = _decompress_range(input_file, start, end)
+            yield data
+
+
+def _lines(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Splits decompressed chunks into lines (with their newline), joining lines that span chunks."""
+    rest = b""
+    for chunk in chunks:
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line + b"\n"
+    if rest:
+        yield rest
+
+
+def open_dump(input_file: Path, decompress_processes: int = 1) -> Iterator[bytes]:
+    """
+    Lines of a compressed dump as bytes. bz2 files (single- or multi-stream) are
+    decompressed block-parallel when `decompress_processes` > 1; .zst needs the
+    `zstandard` package. The returned iterator has a close() method.
+    """
+    if input_file.suffix == ".bz2":
+        if decompress_processes > 1:
+            return _lines(parallel_bz2_chunks(input_file, decompress_processes))
+        return bz2.open(input_file, "rb")
+    if input_file.suffix == ".gz":
+        return gzip.open(input_file, "rb")
+    if input_file.suffix == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Reading .zst dumps requires the zstandard package (pip install zstandard).")
+        # read_across_frames handles multi-frame files, e.g. from parallel zstd
+        reader = zstandard.ZstdDecompressor().stream_reader(open(input_file, "rb"), read_across_frames=True,
+                                                            closefd=True)
+        return io.BufferedReader(reader, buffer_size=SCAN_CHUNK_SIZE)
+    raise ValueError(f"The file must be .bz2, .gz or .zst, but got {input_file.suffix}.")
@@ -11,10 +11,17 @@ from src.wikidata.dump_processing.writer_process import write_data
 
 def get_arg_parser():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--input_file', type=str, required=True, help='path to bz2 wikidata json dump')
+    parser.add_argument('--input_file', type=str, required=True,
+                        help='path to the wikidata json dump (.bz2, .gz or .zst)')
     parser.add_argument('--out_dir', type=str, required=True, help='path to output directory')
     parser.add_argument('--processes', type=int, default=90, help="number of concurrent processes to spin off. ")
     parser.add_argument('--batch_size', type=int, default=10000)
+    parser.add_argument('--decompress_processes', type=int, default=4,
+                        help='processes that decompress bz2 blocks in parallel for the reader (1 = plain bz2)')
+    parser.add_argument('--chunk_lines', type=int, default=1000,
+                        help='maximum number of entities the reader sends to a worker at once')
+    parser.add_argument('--chunk_bytes', type=int, default=4 * 1024 * 1024,
+                        help='the reader sends a chunk as soon as its entities reach this many bytes')
     parser.add_argument('--num_lines_read', type=int, default=-1,
                         help='Terminate after num_lines_read lines are read. Useful for debugging.')
     parser.add_argument('--num_lines_in_dump', type=int, default=-1,
@@ -34,18 +41,20 @@ def main(args):
     max_lines_to_read = args.num_lines_read
     if args.num_lines_in_dump <= 0:
         print("Counting lines")
-        total_num_lines = count_lines(input_file, max_lines_to_read)
+        total_num_lines = count_lines(input_file, max_lines_to_read, args.decompress_processes)
     else:
         total_num_lines = args.num_lines_in_dump
 
-    maxsize = 10 * args.processes
+    # Queues hold chunks, not entities; a few per worker keep them busy at bounded memory
+    maxsize = 2 * args.processes
     output_queue = Queue(maxsize=maxsize)
     work_queue = Queue(maxsize=maxsize)
 
     num_lines_read = multiprocessing.Value("i", 0)
     read_process = Process(
         target=read_data,
-        args=(input_file, num_lines_read, max_lines_to_read, work_queue)
+        args=(input_file, num_lines_read, max_lines_to_read, work_queue, args.decompress_processes,
+              args.chunk_lines, args.chunk_bytes)
     )
 
     read_process.start()
@@ -1,53 +1,67 @@
-import bz2
-import gzip
 from multiprocessing import Queue, Value
 from pathlib import Path
+from typing import List
 
 from tqdm import tqdm
 
+from src.wikidata.dump_processing.decompress import open_dump
 
-def count_lines(input_file: Path, max_lines_to_read: int):
+
+def join_chunk(lines: List[bytes]) -> bytes:
+    """
+    One newline-separated blob per chunk: a single bytes object is pickled with one copy,
+    where a list would pay the pickling and queue overhead per entity. The entities are
+    JSON on one line each, so they contain no raw newlines.
+    """
+    return b"\n".join(lines)
+
+
+def count_lines(input_file: Path, max_lines_to_read: int, decompress_processes: int = 1):
     cnt = 0
-    if input_file.suffix == ".bz2":
-        f = bz2.open(input_file, "r")
-    elif input_file.suffix == ".gz":
-        f = gzip.open(input_file, "rb")
-    else:
-        raise ValueError(f"The file must be either .bz2 or .gz, but got {input_file.suffix}.")
+    f = open_dump(input_file, decompress_processes)
     for _ in tqdm(f, "Counting lines..."):
         cnt += 1
         if max_lines_to_read > 0 and cnt >= max_lines_to_read:
             break
+    f.close()
     return cnt
 
 
-def read_data(input_file: Path, num_lines_read: Value, max_lines_to_read: int, work_queue: Queue):
+def read_data(input_file: Path, num_lines_read: Value, max_lines_to_read: int, work_queue: Queue,
+              decompress_processes: int = 1, chunk_lines: int = 1000, chunk_bytes: int = 4 * 1024 * 1024):
     """
-    Reads the data from the input file and pushes it to the output queue.
-    :param input_file: Path to the input file.
+    Reads the data from the input file and pushes it to the output queue in chunks.
+    :param input_file: Path to the input file (.bz2, .gz or .zst).
     :param num_lines_read: Value to store the number of lines in the input file.
     :param max_lines_to_read: Maximum number of lines to read from the input file (for testing).
     :param work_queue: Queue to push the data to.
+    :param decompress_processes: Processes that decompress bz2 blocks in parallel.
+    :param chunk_lines: Maximum number of entities per chunk.
+    :param chunk_bytes: A chunk is sent as soon as its entities reach this size.
     """
-    if input_file.suffix == ".bz2":
-        f = bz2.open(input_file, "r")
-    elif input_file.suffix == ".gz":
-        f = gzip.GzipFile(input_file, "r")
-    else:
-        raise ValueError(f"The file must be either .bz2 or .gz, but got {input_file.suffix}.")
+    f = open_dump(input_file, decompress_processes)
 
     num_lines = 0
+    chunk = []
+    size = 0
     for ln in f:
         if ln == b"[\n" or ln == b"]\n":
             continue
         if ln.endswith(b",\n"):  # all but the last element
             obj = ln[:-2]
         else:
-            obj = ln
+            obj = ln.rstrip(b"\n")
         num_lines += 1
-        work_queue.put(obj)
+        chunk.append(obj)
+        size += len(obj)
+        if len(chunk) >= chunk_lines or size >= chunk_bytes:
+            work_queue.put(join_chunk(chunk))
+            chunk = []
+            size = 0
         if 0 < max_lines_to_read <= num_lines:
             break
+    if chunk:
+        work_queue.put(join_chunk(chunk))
     num_lines_read.value = num_lines
 
     f.close()
@@ -13,6 +13,8 @@ def process_json(obj):
         'label_en': obj['labels']['en']['value'] if obj['labels'].get('en', {}) else None,
         'label_de': obj['labels']['de']['value'] if obj['labels'].get('de', {}) else None,
         'label_ru': obj['labels']['ru']['value'] if obj['labels'].get('ru', {}) else None,
+        'label_zh': obj['labels']['zh']['value'] if obj['labels'].get('zh', {}) else None,
+        'label_mk': obj['labels']['mk']['value'] if obj['labels'].get('mk', {}) else None,
     })
 
     out_data['descriptions'].append({
@@ -22,15 +24,48 @@ def process_json(obj):
         'description_ru': obj['descriptions']['ru']['value'] if obj['descriptions'].get('ru', {}) else None,
     })
 
+    out_data['popularity'].append({
+        'qid': id,
+        'sitelinks': len(obj.get('sitelinks', {})),
+    })
+
+    edges = []
+    for pid, statements in obj.get('claims', {}).items():
+        for statement in statements:
+            snak = statement.get('mainsnak', {})
+            if statement.get('rank') == 'deprecated' or snak.get('snaktype') != 'value':
+                continue
+            value = snak.get('datavalue', {}).get('value')
+            if isinstance(value, dict) and value.get('entity-type') == 'item':
+                edges.append([pid, value['id']])
+    if edges:
+        # Item-valued statements, for the neighbor index (see build_neighbor_index.py)
+        out_data['edges'].append({'qid': id, 'claims': edges})
+
     return dict(out_data)
 
 
-def process_data(work_queue: Queue, output_queue: Queue):
-    while True:
-        json_obj = work_queue.get()
-        if json_obj is None:
-            break
+def process_chunk(chunk: bytes):
+    """
+    Processes the entities of a chunk (see `reader_process.join_chunk`) and returns the
+    number of entities read with the rows of every table, so that a chunk costs one
+    put on the output queue. Entities that fail to parse are skipped.
+    """
+    lines = chunk.split(b"\n")
+    out_data = defaultdict(list)
+    for line in lines:
         try:
-            output_queue.put(process_json(ujson.loads(json_obj)))
+            tables = process_json(ujson.loads(line))
         except Exception as e:
             continue
+        for table_name, rows in tables.items():
+            out_data[table_name].extend(rows)
+    return len(lines), dict(out_data)
+
+
+def process_data(work_queue: Queue, output_queue: Queue):
+    while True:
+        chunk = work_queue.get()
+        if chunk is None:
+            break
+        output_queue.put(process_chunk(chunk))
@@ -7,7 +7,7 @@ from typing import Dict, Any, List
 import ujson
 
 TABLE_NAMES = [
-    'labels', 'descriptions'
+    'labels', 'descriptions', 'popularity', 'edges'
 ]
 
 
@@ -25,41 +25,47 @@ class Table:
         self.cur_file_writer = None
 
     def write(self, json_value: List[Dict[str, Any]]):
-        if self.cur_file_writer is None:
-            self.cur_file_writer = open(self.cur_file, 'w', encoding='utf-8')
+        # Rows of a whole chunk arrive at once; files still hold batch_size rows each
         for json_obj in json_value:
+            if self.cur_file_writer is None:
+                self.cur_file_writer = open(self.cur_file, 'w', encoding='utf-8')
             self.cur_file_writer.write(ujson.dumps(json_obj, ensure_ascii=False) + '\n')
-        self.cur_num_lines += 1
-        if self.cur_num_lines >= self.batch_size:
-            self.cur_file_writer.close()
-            self.cur_num_lines = 0
-            self.index += 1
-            self.cur_file = self.table_dir / f"{self.index:d}.jsonl"
-            self.cur_file_writer = None
+            self.cur_num_lines += 1
+            if self.cur_num_lines >= self.batch_size:
+                self.cur_file_writer.close()
+                self.cur_num_lines = 0
+                self.index += 1
+                self.cur_file = self.table_dir / f"{self.index:d}.jsonl"
+                self.cur_file_writer = None
 
     def close(self):
-        self.cur_file_writer.close()
+        if self.cur_file_writer is not None:
+            self.cur_file_writer.close()
 
 
 class Writer:
     def __init__(self, path: Path, batch_size: int, total_num_lines: int):
         self.cur_num_lines = 0
+        self.last_report = 0
         self.total_num_lines = total_num_lines
         self.start_time = time.time()
         self.output_tables = {table_name: Table(path, batch_size, table_name) for table_name in TABLE_NAMES}
 
-    def write(self, json_object: Dict[str, Any]):
-        self.cur_num_lines += 1
+    def write(self, num_lines: int, json_object: Dict[str, Any]):
+        """Writes the rows of a chunk of `num_lines` entities (see `worker_process.process_chunk`)."""
+        self.cur_num_lines += num_lines
         for key, value in json_object.items():
             if key not in self.output_tables:
                 continue
             if len(value) > 0:
                 self.output_tables[key].write(value)
-        if self.cur_num_lines % 200000 == 0:
+        if self.cur_num_lines - self.last_report >= 200000:
             time_elapsed = time.time() - self.start_time
-            estimated_time = time_elapsed * (self.total_num_lines - self.cur_num_lines) / (200000 * 3600)
+            lines_written = self.cur_num_lines - self.last_report
+            estimated_time = time_elapsed * (self.total_num_lines - self.cur_num_lines) / (lines_written * 3600)
             print(f"{self.cur_num_lines}/{self.total_num_lines} lines written in {time_elapsed:.2f}s. "
                   f"Estimated time to completion is {estimated_time:.2f} hours.")
+            self.last_report = self.cur_num_lines
             self.start_time = time.time()
 
     def close(self):
@@ -70,8 +76,8 @@ class Writer:
 def write_data(path: Path, batch_size: int, total_num_lines: int, outout_queue: Queue):
     writer = Writer(path, batch_size, total_num_lines)
     while True:
-        json_object = outout_queue.get()
-        if json_object is None:
+        chunk = outout_queue.get()
+        if chunk is None:
             break
-        writer.write(json_object)
+        writer.write(*chunk)
     writer.close()
@@ -0,0 +1,121 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.cache.sqlite_cache import SqliteCache
+from src.wikidata.api import fetch_wikidata, ID_CHUNK_SIZE
+
+# Labels rarely change; missing labels are re-checked sooner
+label_store = SqliteCache("labels", ttl=30 * 24 * 3600, negative_ttl=7 * 24 * 3600, max_entries=2_000_000)
+
+LRU_SIZE = 50_000
+
+
+class LabelCache:
+    """
+    Labels per (entity id, language): an in-process LRU in front of the persistent
+    `label_store`. A cached None means the entity has no label in that language.
+    """
+
+    def __init__(self, maxsize: int = LRU_SIZE):
+        self.maxsize = maxsize
+        self._lru: OrderedDict[Tuple[str, str], Optional[str]] = OrderedDict()
+
+    @staticmethod
+    def _store_key(entity_id: str, language: str) -> str:
+        return f"{entity_id}|{language}"
+
+    def _remember(self, key: Tuple[str, str], label: Optional[str]):
+        self._lru[key] = label
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def lookup(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[str]]:
+        """Returns the cached entries among `keys`, checking the LRU first and then the store."""
+        found = {}
+        remaining = []
+        for key in keys:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                found[key] = self._lru[key]
+            else:
+                remaining.append(key)
+
+        stored = label_store.get_many([self._store_key(*key) for key in remaining])
+        for key in remaining:
+            store_key = self._store_key(*key)
+            if store_key in stored:
+                found[key] = stored[store_key]
+                self._remember(key, stored[store_key])
+        return found
+
+    def update(self, labels: Dict[Tuple[str, str], Optional[str]]):
+        for key, label in labels.items():
+            self._remember(key, label)
+        label_store.put_many((self._store_key(*key), label, label is None) for key, label in labels.items())
+
+
+label_cache = LabelCache()
+
+
+async def _fetch_label_chunk(entity_ids: List[str], languages: Sequence[str]) -> Dict[Tuple[str, str], Optional[str]]:
+    params = {
+        'action': 'wbgetentities',
+        'ids': '|'.join(entity_ids),
+        'props': 'labels',
+        'languages': '|'.join(languages),
+        'format': 'json',
+    }
+    data = await fetch_wikidata(params)
+    if not data or 'entities' not in data:
+        # Failed request: return nothing, so nothing is cached and the next call retries
+        print(f"--> API Error during label request for IDs {entity_ids}")
+        return {}
+
+    labels = {}
+    for entity_id in entity_ids:
+        entity_labels = data['entities'].get(entity_id, {}).get('labels', {})
+        for language in languages:
+            label_data = entity_labels.get(language)
+            labels[(entity_id, language)] = label_data['value'] if label_data else None
+    return labels
+
+
+async def fetch_labels(entity_ids: Sequence[str], languages: Sequence[str] = ('en',)) -> Dict[str, Dict[str, str]]:
+    """
+    Fetches the labels of Wikidata entity IDs (e.g. 'Q42', 'P31') in several languages.
+
+    Cached labels are served from the label cache; the rest are requested in chunks of
+    50 IDs (the wbgetentities limit), all languages per request, with the chunks running
+    concurrently under the Wikidata rate limiter.
+
+    Returns {entity id: {language: label}}; languages without a label are left out.
+    """
+    entity_ids = list(dict.fromkeys(entity_ids))
+    languages = list(dict.fromkeys(languages))
+    keys = [(entity_id, language) for entity_id in entity_ids for language in languages]
+
+    labels = label_cache.lookup(keys)
+
+    missing_ids = list(dict.fromkeys(entity_id for entity_id, language in keys if (entity_id, language) not in labels))
+    if missing_ids:
+        chunks = await asyncio.gather(*[
+            _fetch_label_chunk(missing_ids[i:i + ID_CHUNK_SIZE], languages)
+            for i in range(0, len(missing_ids), ID_CHUNK_SIZE)
+        ])
+        fetched = {key: label for chunk in chunks for key, label in chunk.items()}
+        label_cache.update(fetched)
+        labels.update(fetched)
+
+    results: Dict[str, Dict[str, str]] = {}
+    for (entity_id, language), label in labels.items():
+        if label is not None:
+            results.setdefault(entity_id, {})[language] = label
+    return results
+
+
+async def get_wikidata_labels_async(entity_ids: Sequence[str], language: str = 'en') -> Dict[str, str]:
+    """Async, cached counterpart of `get_wikidata_labels`: maps each ID to its label in `language`."""
+    labels = await fetch_labels(entity_ids, [language])
+    return {entity_id: by_language[language] for entity_id, by_language in labels.items()}
@@ -0,0 +1,130 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_NEIGHBORS_PER_ITEM = 5
+
+
+def entity_key(entity_id: str) -> int:
+    """Numeric key of an entity in the index: Q42 -> 42, P31 -> -31."""
+    number = int(entity_id[1:])
+    return -number if entity_id[0] == "P" else number
+
+
+def find(keys: np.ndarray, key: int) -> int:
+    """Position of `key` in the sorted array `keys`, or -1."""
+    position = int(np.searchsorted(keys, key))
+    return position if position < len(keys) and keys[position] == key else -1
+
+
+class IndexLabels:
+    """
+    Labels of the offline indexes: `label_keys.npy` holds the sorted entity keys (see
+    `entity_key`), and `labels_{lang}.offsets.npy` / `labels_{lang}.bin` their UTF-8
+    labels per language, where an empty label means none. All files are memory-mapped.
+    """
+
+    def __init__(self, index_dir: Path, languages: List[str]):
+        self.keys = np.load(index_dir / "label_keys.npy", mmap_mode="r")
+        self.offsets = {lang: np.load(index_dir / f"labels_{lang}.offsets.npy", mmap_mode="r") for lang in languages}
+        self.blobs = {
+            lang: np.memmap(index_dir / f"labels_{lang}.bin", dtype=np.uint8, mode="r")
+            if (index_dir / f"labels_{lang}.bin").stat().st_size else np.zeros(0, dtype=np.uint8)
+            for lang in languages
+        }
+
+    def label(self, key: int, language: str) -> Optional[str]:
+        if language not in self.offsets:
+            return None
+        position = find(self.keys, key)
+        if position < 0:
+            return None
+        offsets = self.offsets[language]
+        start, end = int(offsets[position]), int(offsets[position + 1])
+        if start == end:
+            return None
+        return self.blobs[language][start:end].tobytes().decode("utf-8")
+
+
+class NeighborIndex:
+    """
+    Read side of the offline neighbor index written by `build_neighbor_index.py`.
+
+    Per item it keeps a few outgoing (property, value) and incoming (subject, property)
+    edges, most popular first, in CSR arrays, plus labels in the languages of the dump
+    tables. All arrays are memory-mapped, so lookups need no network and little memory.
+
+    Files in the index directory:
+        meta.json                          languages and edges kept per item and direction
+        items.npy                          sorted Q numbers of the items with edges
+        out_offsets.npy, out_edges.npy     CSR rows of (property number, value Q number)
+        in_offsets.npy, in_edges.npy       CSR rows of (property number, subject Q number)
+        label_keys.npy, labels_*           see `IndexLabels`
+    """
+
+    def __init__(self, index_dir: str | Path):
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.languages: List[str] = self.meta["languages"]
+
+        self.items = self._load("items.npy")
+        self.out_offsets, self.out_edges = self._load("out_offsets.npy"), self._load("out_edges.npy")
+        self.in_offsets, self.in_edges = self._load("in_offsets.npy"), self._load("in_edges.npy")
+        self.labels = IndexLabels(self.index_dir, self.languages)
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(self.index_dir / name, mmap_mode="r")
+
+    def label(self, key: int, language: str) -> Optional[str]:
+        """Label in `language`, falling back to English per label like the SPARQL enrichment."""
+        return self.labels.label(key, language) or self.labels.label(key, "en")
+
+    def edges(self, qid: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Outgoing (property, value) and incoming (property, subject) number pairs of an item."""
+        position = find(self.items, entity_key(qid))
+        if position < 0:
+            empty = np.zeros((0, 2), dtype=np.int64)
+            return empty, empty
+        return (self.out_edges[self.out_offsets[position]:self.out_offsets[position + 1]],
+                self.in_edges[self.in_offsets[position]:self.in_offsets[position + 1]])
+
+    def neighbors(self, qid: str, language: str = "en", limit: int = DEFAULT_NEIGHBORS_PER_ITEM) -> List[str]:
+        """
+        Same strings as the SPARQL enrichment, e.g. "  - (This) -> [discoverer or inventor] -> Bernhard Riemann".
+        Like the SPARQL enrichment, edges without labels in `language` or English are skipped.
+        """
+        out_edges, in_edges = self.edges(qid)
+        results = []
+
+        count = 0
+        for pid, value in out_edges:
+            p, v = self.label(-int(pid), language), self.label(int(value), language)
+            if p and v and count < limit:
+                results.append(f"  - (This) -> [{p}] -> {v}")
+                count += 1
+
+        count = 0
+        for pid, subject in in_edges:
+            s, p = self.label(int(subject), language), self.label(-int(pid), language)
+            if s and p and count < limit:
+                results.append(f"  - {s} -> [{p}] -> (This)")
+                count += 1
+
+        return results
+
+
+_indexes: Dict[str, NeighborIndex] = {}
+
+
+def get_neighbor_index() -> Optional[NeighborIndex]:
+    """The index in NEIGHBOR_INDEX_DIR, or None when the variable is not set (enrichment then uses SPARQL)."""
+    index_dir = os.getenv("NEIGHBOR_INDEX_DIR")
+    if not index_dir:
+        return None
+    if index_dir not in _indexes:
+        _indexes[index_dir] = NeighborIndex(index_dir)
+    return _indexes[index_dir]
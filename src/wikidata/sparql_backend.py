@@ -0,0 +1,360 @@
+import asyncio
+import gzip
+import json
+import os
+import re
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import aiohttp
+
+from src.http_client.rate_limiter import rate_limiter, parse_retry_after
+from src.http_client.resilience import CircuitBreaker, LatencyTracker, hedged
+from src.http_client.session import get_session, request_timeout, USER_AGENT
+from src.wikidata.prefixes import ensure_prefixes
+from src.wikidata.sparql_results import BindingsStreamParser
+
+SPARQL_ENDPOINT_URL = "https://query.wikidata.org/sparql"
+DEFAULT_LOCAL_STORE_PATH = "../local_store/qald_10_truthy.nt.gz"
+
+BACKEND_HTTP = "http"
+BACKEND_LOCAL = "local"
+
+# Hedge delay used until enough latencies were observed, and the lower bound of the delay
+DEFAULT_HEDGE_DELAY = 2.0
+MIN_HEDGE_DELAY = 0.2
+
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
+_LABEL_SERVICE = re.compile(r'SERVICE\s+wikibase:label\s*\{(?P<body>[^{}]*)\}', re.IGNORECASE)
+_LABEL_LANGUAGE = re.compile(r'wikibase:language\s+"([^"]*)"')
+_LABEL_VARIABLE = re.compile(r'\?(\w+?)(Label|Description)\b')
+
+
+class QueryOutcome(NamedTuple):
+    """The result of `SparqlBackend.execute` with what the caching and the circuit breaker need to know."""
+    result: Any
+    # False when the answer did not come from the endpoint of the cache namespace (e.g. a fallback)
+    cacheable: bool = True
+    # True when the endpoint itself failed (transport error, HTTP 5xx or 429), not just this query
+    endpoint_failure: bool = False
+
+
+class SparqlBackend(ABC):
+    """Executes SPARQL queries for the agent; see `get_sparql_backend` for the configured one."""
+
+    name: str
+    # Whether results may be kept in the persistent SPARQL cache
+    persistent_cache: bool = True
+
+    @property
+    def cache_namespace(self) -> str:
+        """Separates the cached results of different backends and endpoints."""
+        return self.name
+
+    @abstractmethod
+    async def execute(self, query: str, max_results: int, retries: int = 3, delay: int = 5) -> Any:
+        """
+        Returns at most `max_results` bindings of a SELECT query, the boolean of an ASK
+        query, [] for any other response, or None if the query could not be executed.
+        """
+
+    async def execute_outcome(self, query: str, max_results: int, retries: int = 3, delay: int = 5) -> QueryOutcome:
+        """Like `execute`, telling apart failures of the endpoint from failures of the query."""
+        result = await self.execute(query, max_results, retries, delay)
+        return QueryOutcome(result, endpoint_failure=result is None)
+
+
+class HttpSparqlBackend(SparqlBackend):
+    """A SPARQL endpoint over HTTP, by default query.wikidata.org."""
+
+    name = BACKEND_HTTP
+
+    def __init__(self, endpoint_url: str = SPARQL_ENDPOINT_URL):
+        self.endpoint_url = endpoint_url
+
+    @property
+    def cache_namespace(self) -> str:
+        # The default endpoint keeps the plain name, so existing cache entries stay valid
+        return self.name if self.endpoint_url == SPARQL_ENDPOINT_URL else f"{self.name}:{self.endpoint_url}"
+
+    async def execute(self, query: str, max_results: int, retries: int = 3, delay: int = 5) -> Any:
+        return (await self.execute_outcome(query, max_results, retries, delay)).result
+
+    async def execute_outcome(self, query: str, max_results: int, retries: int = 3, delay: int = 5) -> QueryOutcome:
+        session = get_session()
+        # Whether the last attempt failed because of the endpoint rather than the query
+        endpoint_failure = False
+
+        params = {
+            "query": query,
+            "format": "json"
+        }
+
+        for attempt in range(retries):
+            try:
+                await rate_limiter.acquire("wikidata_sparql", self.endpoint_url)
+                async with session.get(
+                        self.endpoint_url,
+                        params=params,
+                        headers={'Accept': 'application/sparql-results+json', 'User-Agent': USER_AGENT},
+                        timeout=request_timeout(30)
+                ) as response:
+
+                    if response.status == 429:
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"), delay)
+                        print(f"⚠️ Query rate limited (HTTP 429). Retrying in {retry_after} seconds...",
+                              file=sys.stderr)
+                        rate_limiter.penalize("wikidata_sparql", self.endpoint_url, retry_after)
+                        delay *= 2
+                        endpoint_failure = True
+                        continue
+
+                    if response.status == 504:
+                        # The query ran into the endpoint's time limit; other queries are unaffected
+                        print(f"⚠️ Query timed out (HTTP 504). Retrying in {delay} seconds...", file=sys.stderr)
+                        await asyncio.sleep(delay)
+                        delay *= 2
+                        endpoint_failure = False
+                        continue
+
+                    response.raise_for_status()
+
+                    # Stop reading as soon as enough bindings are parsed; the rest of the body is dropped
+                    parser = BindingsStreamParser(max_results, response.charset or "utf-8")
+                    async for chunk in response.content.iter_chunked(RESPONSE_CHUNK_SIZE):
+                        parser.feed(chunk)
+                        if parser.done:
+                            break
+                    return QueryOutcome(parser.finish())
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"SPARQL query error on attempt {attempt + 1}: {e}", file=sys.stderr)
+                # 4xx responses (e.g. a syntax error) are the query's fault
+                endpoint_failure = not isinstance(e, aiohttp.ClientResponseError) or e.status >= 500
+                if attempt < retries - 1:
+                    await asyncio.sleep(delay)
+                    delay *= 2
+                else:
+                    return QueryOutcome(None, endpoint_failure=endpoint_failure)
+            except Exception as e:
+                print(f"Wikidata error in executing query: {e}")
+                return QueryOutcome(None)
+        return QueryOutcome(None, endpoint_failure=endpoint_failure)
+
+
+def rewrite_label_service(query: str) -> str:
+    """
+    Replaces the Wikidata-specific `SERVICE wikibase:label` block with plain OPTIONAL
+    rdfs:label / schema:description patterns for every ?xLabel / ?xDescription variable
+    whose ?x is used in the query, in the first language of the service.
+    """
+    match = _LABEL_SERVICE.search(query)
+    if match is None:
+        return query
+
+    languages = _LABEL_LANGUAGE.search(match.group("body"))
+    language = "en"
+    if languages:
+        first = languages.group(1).split(",")[0].strip()
+        if first and not first.startswith("["):
+            language = first
+
+    rest = query[:match.start()] + query[match.end():]
+    patterns = []
+    for base, kind in dict.fromkeys(_LABEL_VARIABLE.findall(rest)):
+        if not re.search(rf'\?{re.escape(base)}\b', rest):
+            continue
+        predicate = "rdfs:label" if kind == "Label" else "schema:description"
+        patterns.append(
+            f'OPTIONAL {{ ?{base} {predicate} ?{base}{kind} . FILTER(LANG(?{base}{kind}) = "{language}") }}'
+        )
+    return query[:match.start()] + "\n".join(patterns) + query[match.end():]
+
+
+class LocalSparqlBackend(SparqlBackend):
+    """
+    An in-process rdflib store loaded from an N-Triples/Turtle file (optionally .gz),
+    e.g. the QALD-10 subset of the truthy dump written by `build_local_store.py`.
+
+    The file is loaded on the first query. Queries run in a worker thread, one at a
+    time, and the label service is emulated with `rewrite_label_service`.
+    """
+
+    name = BACKEND_LOCAL
+    persistent_cache = False
+
+    def __init__(self, store_path: str = DEFAULT_LOCAL_STORE_PATH):
+        self.store_path = Path(store_path)
+        self._graph = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        from rdflib import Graph
+
+        if not self.store_path.exists():
+            raise FileNotFoundError(f"Local SPARQL store '{self.store_path}' does not exist. "
+                                    f"Build it with src/wikidata/build_local_store.py.")
+
+        suffixes = self.store_path.suffixes
+        rdf_format = "turtle" if ".ttl" in suffixes else "nt"
+        graph = Graph()
+        print(f"Loading local SPARQL store '{self.store_path}'...")
+        if suffixes and suffixes[-1] == ".gz":
+            with gzip.open(self.store_path, "rb") as f:
+                graph.parse(source=f, format=rdf_format)
+        else:
+            graph.parse(str(self.store_path), format=rdf_format)
+        print(f"Loaded {len(graph)} triples.")
+        self._graph = graph
+
+    @property
+    def graph(self):
+        with self._lock:
+            if self._graph is None:
+                self._load()
+        return self._graph
+
+    def query_json(self, query: str) -> Dict[str, Any]:
+        """Runs a query and returns the full SPARQL JSON results document, as an endpoint would."""
+        graph = self.graph
+        with self._lock:
+            result = graph.query(ensure_prefixes(rewrite_label_service(query)))
+            if result.type not in ("SELECT", "ASK"):
+                return {}
+            return json.loads(result.serialize(format="json"))
+
+    def _execute(self, query: str, max_results: int) -> Any:
+        response_json = self.query_json(query)
+        if "boolean" in response_json:
+            return response_json["boolean"]
+        return response_json.get("results", {}).get("bindings", [])[:max_results]
+
+    async def execute(self, query: str, max_results: int, retries: int = 3, delay: int = 5) -> Any:
+        try:
+            return await asyncio.to_thread(self._execute, query, max_results)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            print(f"Local SPARQL error in executing query: {e}", file=sys.stderr)
+            return None
+
+
+class ResilientSparqlBackend(SparqlBackend):
+    """
+    Wraps a backend with a circuit breaker and optional request hedging.
+
+    While the breaker is open, queries go to `fallback` if one is given, otherwise they
+    fail fast with None instead of walking through the retries of a degraded endpoint.
+    Fallback answers are not cacheable, since the cache namespace is the primary's. Only
+    endpoint failures (see `QueryOutcome`) count against the breaker, not bad queries.
+    With `hedge`, a second identical query is sent when the first one is slower than the
+    `hedge_percentile` of recent successful latencies, and the first result wins.
+    """
+
+    def __init__(
+            self,
+            primary: SparqlBackend,
+            fallback: Optional[SparqlBackend] = None,
+            breaker: Optional[CircuitBreaker] = None,
+            hedge: bool = False,
+            hedge_percentile: float = 0.9,
+    ):
+        self.primary = primary
+        self.fallback = fallback
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.latencies = LatencyTracker()
+        self.name = primary.name
+        self.persistent_cache = primary.persistent_cache
+
+    @property
+    def cache_namespace(self) -> str:
+        return self.primary.cache_namespace
+
+    async def execute(self, query: str, max_results: int, retries: int = 3, delay: int = 5) -> Any:
+        return (await self.execute_outcome(query, max_results, retries, delay)).result
+
+    async def execute_outcome(self, query: str, max_results: int, retries: int = 3, delay: int = 5) -> QueryOutcome:
+        if not self.breaker.allow():
+            if self.fallback is not None:
+                result = await self.fallback.execute(query, max_results, retries, delay)
+                return QueryOutcome(result, cacheable=False)
+            print(f"SPARQL endpoint unavailable (circuit {self.breaker.state}); not running the query.",
+                  file=sys.stderr)
+            return QueryOutcome(None, cacheable=False, endpoint_failure=True)
+
+        def call():
+            return self.primary.execute_outcome(query, max_results, retries, delay)
+
+        start = time.monotonic()
+        completed = False
+        try:
+            if self.hedge:
+                hedge_delay = max(MIN_HEDGE_DELAY,
+                                  self.latencies.percentile(self.hedge_percentile, DEFAULT_HEDGE_DELAY))
+                outcome = await hedged(call, hedge_delay, failed=lambda o: o.result is None)
+            else:
+                outcome = await call()
+            completed = True
+        finally:
+            if not completed:
+                self.breaker.release()
+
+        self.breaker.record(not outcome.endpoint_failure)
+        if outcome.result is not None:
+            self.latencies.record(time.monotonic() - start)
+        return outcome
+
+
+_backends: Dict[Tuple, SparqlBackend] = {}
+
+
+def _is_on(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() not in ("0", "off", "false", "no")
+
+
+def get_sparql_backend() -> SparqlBackend:
+    """
+    Returns the backend selected by the environment (read on every call, so the
+    benchmark CLI can set it; instances are reused):
+    - SPARQL_BACKEND: http (default) or local
+    - SPARQL_ENDPOINT_URL: endpoint of the http backend
+    - LOCAL_STORE_PATH: RDF file of the local backend
+    - SPARQL_CIRCUIT_BREAKER: on (default) or off, for the http backend
+    - SPARQL_FALLBACK_BACKEND: local to answer from the local store while the breaker is open
+    - SPARQL_HEDGE: on or off (default); SPARQL_HEDGE_PERCENTILE: latency percentile
+      after which a hedged request is sent (default 0.9)
+    """
+    kind = os.getenv("SPARQL_BACKEND", BACKEND_HTTP).lower()
+    if kind == BACKEND_HTTP:
+        key = (kind, os.getenv("SPARQL_ENDPOINT_URL", SPARQL_ENDPOINT_URL))
+    elif kind == BACKEND_LOCAL:
+        key = (kind, os.getenv("LOCAL_STORE_PATH", DEFAULT_LOCAL_STORE_PATH))
+    else:
+        raise ValueError(f"Unknown SPARQL_BACKEND '{kind}'. Use http or local.")
+
+    if kind == BACKEND_HTTP and _is_on("SPARQL_CIRCUIT_BREAKER", "on"):
+        fallback = os.getenv("SPARQL_FALLBACK_BACKEND", "").lower()
+        if fallback not in ("", BACKEND_LOCAL):
+            raise ValueError(f"Unknown SPARQL_FALLBACK_BACKEND '{fallback}'. Use local or leave it unset.")
+        key += (fallback, _is_on("SPARQL_HEDGE", "off"), float(os.getenv("SPARQL_HEDGE_PERCENTILE", 0.9)))
+
+    if key not in _backends:
+        if kind == BACKEND_LOCAL:
+            _backends[key] = LocalSparqlBackend(key[1])
+        elif len(key) == 2:
+            _backends[key] = HttpSparqlBackend(key[1])
+        else:
+            fallback = None
+            if key[2] == BACKEND_LOCAL:
+                fallback = LocalSparqlBackend(os.getenv("LOCAL_STORE_PATH", DEFAULT_LOCAL_STORE_PATH))
+            _backends[key] = ResilientSparqlBackend(
+                HttpSparqlBackend(key[1]), fallback=fallback, hedge=key[3], hedge_percentile=key[4]
+            )
+    return _backends[key]
@@ -0,0 +1,74 @@
+import codecs
+import json
+import re
+from typing import Any, List
+
+_BINDINGS_START = re.compile(r'"bindings"\s*:\s*\[')
+_SEPARATORS = " \t\r\n,"
+
+
+class BindingsStreamParser:
+    """
+    Incrementally extracts `results.bindings` from a SPARQL JSON response.
+
+    Feed it the body chunk by chunk; once `max_results` bindings (or the end of the
+    array) have been read, `done` is set and the rest of the body can be dropped.
+    Only the not yet parsed tail of the body is kept in memory.
+    """
+
+    def __init__(self, max_results: int, encoding: str = "utf-8"):
+        self.max_results = max_results
+        self.bindings: List[dict] = []
+        self.done = False
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._head = ""
+        self._in_bindings = False
+
+    def feed(self, chunk: bytes):
+        if self.done:
+            return
+        self._buffer += self._decoder.decode(chunk)
+
+        if not self._in_bindings:
+            match = _BINDINGS_START.search(self._buffer)
+            if not match:
+                # Still in the head (or an ASK response); kept for `finish`
+                return
+            self._head = self._buffer[:match.start()]
+            self._buffer = self._buffer[match.end():]
+            self._in_bindings = True
+
+        position = 0
+        while len(self.bindings) < self.max_results:
+            while position < len(self._buffer) and self._buffer[position] in _SEPARATORS:
+                position += 1
+            if position >= len(self._buffer):
+                break
+            if self._buffer[position] == "]":
+                self.done = True
+                break
+            try:
+                binding, position = self._json.raw_decode(self._buffer, position)
+            except json.JSONDecodeError:
+                # The object is cut off at the end of the chunk; wait for more data
+                break
+            self.bindings.append(binding)
+
+        if len(self.bindings) >= self.max_results:
+            self.done = True
+        self._buffer = self._buffer[position:]
+
+    def finish(self) -> Any:
+        """
+        Returns the parsed result like the old full parse did: the bindings list, the
+        boolean of an ASK query, or [] for anything else.
+        """
+        if self._in_bindings:
+            return self.bindings
+        body = self._buffer + self._decoder.decode(b"", final=True)
+        response_json = json.loads(body) if body.strip() else {}
+        if "boolean" in response_json:
+            return response_json["boolean"]
+        return []
@@ -0,0 +1,247 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter, deque
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+
+from src.wikidata.api import normalize_query
+from src.wikidata.sparql_backend import LocalSparqlBackend
+
+ENTITY_URI = "http://www.wikidata.org/entity/"
+RDFS_LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+SCHEMA_DESCRIPTION = "http://schema.org/description"
+SKOS_ALT_LABEL = "http://www.w3.org/2004/02/skos/core#altLabel"
+
+
+def get_arg_parser():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Wikidata API and SPARQL endpoint.")
+    parser.add_argument('--host', type=str, default="localhost")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--fixtures', type=str, default=None, help='JSON file with entities and SPARQL responses')
+    parser.add_argument('--local_store', type=str, default=None,
+                        help='RDF file used for SPARQL queries and entity labels missing from the fixtures')
+    parser.add_argument('--latency_ms', type=float, default=0.0, help='mean added latency per request')
+    parser.add_argument('--latency_jitter_ms', type=float, default=0.0, help='uniform jitter around the latency')
+    parser.add_argument('--rate_429', type=float, default=0.0, help='probability of answering 429')
+    parser.add_argument('--rate_504', type=float, default=0.0, help='probability of answering 504 (SPARQL only)')
+    parser.add_argument('--retry_after', type=float, default=1.0, help='Retry-After seconds sent with a 429')
+    parser.add_argument('--max_rps', type=float, default=0.0,
+                        help='answer 429 when an endpoint gets more requests per second than this (0 = off)')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the fault injection')
+    return parser
+
+
+class StandinWikidata:
+    """
+    Stand-in for the parts of www.wikidata.org and query.wikidata.org the agent uses, for
+    load tests that must not hit the public services.
+
+    Serves `wbsearchentities` and `wbgetentities` on /w/api.php and SPARQL JSON results on
+    /sparql, from a fixture file and/or the local SPARQL store, with configurable latency
+    and injected 429/504 responses; /stats counts responses per endpoint and status.
+    Point the agent at it with
+
+        WIKIDATA_API_URL=http://localhost:8089/w/api.php
+        SPARQL_ENDPOINT_URL=http://localhost:8089/sparql
+
+    Fixture file format (every part optional):
+
+        {
+          "entities": {"Q64": {"labels": {"en": "Berlin"}, "descriptions": {"en": "capital of Germany"},
+                               "aliases": {"en": ["Berlin, Germany"]}}},
+          "sparql": [{"query": "SELECT ...", "response": {"head": {...}, "results": {"bindings": [...]}}}]
+        }
+    """
+
+    def __init__(
+            self,
+            fixtures: Optional[Dict[str, Any]] = None,
+            store: Optional[LocalSparqlBackend] = None,
+            latency_ms: float = 0.0,
+            latency_jitter_ms: float = 0.0,
+            rate_429: float = 0.0,
+            rate_504: float = 0.0,
+            retry_after: float = 1.0,
+            max_rps: float = 0.0,
+            seed: Optional[int] = None,
+    ):
+        fixtures = fixtures or {}
+        self.entities: Dict[str, Dict[str, Any]] = fixtures.get("entities", {})
+        self.sparql_responses = {
+            normalize_query(entry["query"]): entry["response"] for entry in fixtures.get("sparql", [])
+        }
+        self.store = store
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.rate_429 = rate_429
+        self.rate_504 = rate_504
+        self.retry_after = retry_after
+        self.max_rps = max_rps
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self._recent: Dict[str, deque] = {"api": deque(), "sparql": deque()}
+
+        if store is not None:
+            self._add_store_entities()
+
+    def _add_store_entities(self):
+        """Takes labels, descriptions and aliases of entities not in the fixtures from the store."""
+        fields = {RDFS_LABEL: "labels", SCHEMA_DESCRIPTION: "descriptions", SKOS_ALT_LABEL: "aliases"}
+        fixture_ids = set(self.entities)
+        for subject, predicate, obj in self.store.graph:
+            field = fields.get(str(predicate))
+            if field is None or not str(subject).startswith(ENTITY_URI) or not getattr(obj, "language", None):
+                continue
+            entity_id = str(subject)[len(ENTITY_URI):]
+            if entity_id in fixture_ids:
+                continue
+            entity = self.entities.setdefault(entity_id, {})
+            if field == "aliases":
+                entity.setdefault(field, {}).setdefault(obj.language, []).append(str(obj))
+            else:
+                entity.setdefault(field, {})[obj.language] = str(obj)
+        print(f"Serving {len(self.entities)} entities.")
+
+    async def _inject_faults(self, endpoint: str) -> Optional[web.Response]:
+        delay_ms = self.latency_ms + self.random.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+        if self.max_rps > 0:
+            now = time.monotonic()
+            recent = self._recent[endpoint]
+            while recent and recent[0] < now - 1.0:
+                recent.popleft()
+            recent.append(now)
+            if len(recent) > self.max_rps:
+                return self._too_many_requests()
+
+        if self.random.random() < self.rate_429:
+            return self._too_many_requests()
+        if endpoint == "sparql" and self.random.random() < self.rate_504:
+            return web.Response(status=504, text="Gateway Timeout")
+        return None
+
+    def _too_many_requests(self) -> web.Response:
+        return web.Response(status=429, text="Too Many Requests", headers={"Retry-After": f"{self.retry_after:g}"})
+
+    def _respond(self, endpoint: str, response: web.Response) -> web.Response:
+        self.stats[f"{endpoint} {response.status}"] += 1
+        return response
+
+    async def api(self, request: web.Request) -> web.Response:
+        fault = await self._inject_faults("api")
+        if fault is not None:
+            return self._respond("api", fault)
+
+        params = request.query
+        action = params.get("action")
+        if action == "wbsearchentities":
+            body = self._search(params.get("search", ""), params.get("language", "en"), int(params.get("limit", 7)))
+        elif action == "wbgetentities":
+            body = self._get_entities(params.get("ids", "").split("|"), params.get("languages", "en").split("|"))
+        else:
+            body = {"error": {"code": "badvalue", "info": f"Unsupported action '{action}' in the stand-in server."}}
+        return self._respond("api", web.json_response(body))
+
+    def _search(self, search: str, language: str, limit: int) -> Dict[str, Any]:
+        needle = search.strip().lower()
+        exact, prefix = [], []
+        for entity_id, entity in self.entities.items():
+            names = [entity.get("labels", {}).get(language)] + entity.get("aliases", {}).get(language, [])
+            names = [name for name in names if name]
+            if any(name.lower() == needle for name in names):
+                exact.append(entity_id)
+            elif any(name.lower().startswith(needle) for name in names):
+                prefix.append(entity_id)
+
+        results = []
+        for entity_id in (exact + prefix)[:limit]:
+            entity = self.entities[entity_id]
+            label = entity.get("labels", {}).get(language, entity_id)
+            results.append({
+                "id": entity_id,
+                "title": entity_id,
+                "concepturi": f"{ENTITY_URI}{entity_id}",
+                "label": label,
+                "description": entity.get("descriptions", {}).get(language, ""),
+                "match": {"type": "label", "language": language, "text": label},
+            })
+        return {"searchinfo": {"search": search}, "search": results, "success": 1}
+
+    def _get_entities(self, ids, languages) -> Dict[str, Any]:
+        entities = {}
+        for entity_id in ids:
+            entity = self.entities.get(entity_id)
+            if entity is None:
+                entities[entity_id] = {"id": entity_id, "missing": ""}
+                continue
+            entities[entity_id] = {
+                "id": entity_id,
+                "labels": {
+                    language: {"language": language, "value": entity["labels"][language]}
+                    for language in languages if language in entity.get("labels", {})
+                },
+            }
+        return {"entities": entities, "success": 1}
+
+    async def sparql(self, request: web.Request) -> web.Response:
+        fault = await self._inject_faults("sparql")
+        if fault is not None:
+            return self._respond("sparql", fault)
+
+        query = request.query.get("query", "")
+        if request.method == "POST":
+            query = (await request.post()).get("query", query)
+
+        body = self.sparql_responses.get(normalize_query(query))
+        if body is None and self.store is not None:
+            try:
+                body = await asyncio.to_thread(self.store.query_json, query)
+            except Exception as e:
+                return self._respond("sparql", web.Response(status=400, text=f"Query error: {e}"))
+        if body is None:
+            body = {"head": {"vars": []}, "results": {"bindings": []}}
+        return self._respond("sparql", web.json_response(body, content_type="application/sparql-results+json"))
+
+    async def stats_handler(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats))
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/w/api.php", self.api)
+        app.router.add_route("*", "/sparql", self.sparql)
+        app.router.add_get("/stats", self.stats_handler)
+        return app
+
+
+def main(args):
+    fixtures = None
+    if args.fixtures:
+        with open(args.fixtures, "r", encoding="utf-8") as f:
+            fixtures = json.load(f)
+    store = LocalSparqlBackend(args.local_store) if args.local_store else None
+
+    server = StandinWikidata(
+        fixtures=fixtures,
+        store=store,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        rate_429=args.rate_429,
+        rate_504=args.rate_504,
+        retry_after=args.retry_after,
+        max_rps=args.max_rps,
+        seed=args.seed,
+    )
+    try:
+        web.run_app(server.app(), host=args.host, port=args.port)
+    finally:
+        print(f"Responses: {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main(get_arg_parser().parse_args())
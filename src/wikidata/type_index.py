@@ -0,0 +1,102 @@
+import json
+import os
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.wikidata.neighbor_index import IndexLabels, find
+
+# Classes visited at most when a superclass closure is not precomputed
+MAX_WALK = 2_000
+
+
+class TypeIndex:
+    """
+    Read side of the instance-of / subclass-of index written by `build_type_index.py`.
+
+    Direct P31 and P279 values are CSR rows indexed by Q number, so a lookup is two array
+    reads. The transitive P279 closure (all superclasses) is precomputed for frequent
+    classes and walked on the fly for the rest. All arrays are memory-mapped.
+
+    Files in the index directory:
+        meta.json                                 languages and closure threshold
+        p31_offsets.npy, p31_values.npy           direct instance-of classes per Q number
+        p279_offsets.npy, p279_values.npy         direct superclasses per Q number
+        closure_classes.npy                       sorted Q numbers of the frequent classes
+        closure_offsets.npy, closure_values.npy   their sorted transitive superclasses
+        label_keys.npy, labels_*                  see `IndexLabels`
+    """
+
+    def __init__(self, index_dir: str | Path):
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.languages: List[str] = self.meta["languages"]
+
+        self.p31_offsets, self.p31_values = self._load("p31_offsets.npy"), self._load("p31_values.npy")
+        self.p279_offsets, self.p279_values = self._load("p279_offsets.npy"), self._load("p279_values.npy")
+        self.closure_classes = self._load("closure_classes.npy")
+        self.closure_offsets = self._load("closure_offsets.npy")
+        self.closure_values = self._load("closure_values.npy")
+        self.labels = IndexLabels(self.index_dir, self.languages)
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(self.index_dir / name, mmap_mode="r")
+
+    @staticmethod
+    def _row(offsets: np.ndarray, values: np.ndarray, number: int) -> np.ndarray:
+        if number < 0 or number + 1 >= len(offsets):
+            return values[:0]
+        return values[offsets[number]:offsets[number + 1]]
+
+    def instance_of(self, number: int) -> np.ndarray:
+        return self._row(self.p31_offsets, self.p31_values, number)
+
+    def subclass_of(self, number: int) -> np.ndarray:
+        return self._row(self.p279_offsets, self.p279_values, number)
+
+    def superclasses(self, number: int) -> np.ndarray:
+        """Sorted transitive P279 superclasses of a class, without the class itself."""
+        position = find(self.closure_classes, number)
+        if position >= 0:
+            return self.closure_values[self.closure_offsets[position]:self.closure_offsets[position + 1]]
+
+        seen = set()
+        queue = deque(int(parent) for parent in self.subclass_of(number))
+        while queue and len(seen) < MAX_WALK:
+            parent = queue.popleft()
+            if parent in seen or parent == number:
+                continue
+            seen.add(parent)
+            queue.extend(int(grandparent) for grandparent in self.subclass_of(parent))
+        return np.array(sorted(seen), dtype=np.int32)
+
+    def is_a(self, qid: str, class_qid: str) -> bool:
+        """Whether the entity is an instance or subclass of the class, directly or through P279."""
+        number, class_number = int(qid[1:]), int(class_qid[1:])
+        for direct in np.concatenate([self.instance_of(number), self.subclass_of(number)]):
+            if direct == class_number:
+                return True
+            ancestors = self.superclasses(int(direct))
+            position = int(np.searchsorted(ancestors, class_number))
+            if position < len(ancestors) and ancestors[position] == class_number:
+                return True
+        return False
+
+    def label(self, number: int, language: str = "en") -> Optional[str]:
+        return self.labels.label(number, language)
+
+
+_indexes: Dict[str, TypeIndex] = {}
+
+
+def get_type_index() -> Optional[TypeIndex]:
+    """The index in TYPE_INDEX_DIR, or None when the variable is not set (schema lookups then use SPARQL)."""
+    index_dir = os.getenv("TYPE_INDEX_DIR")
+    if not index_dir:
+        return None
+    if index_dir not in _indexes:
+        _indexes[index_dir] = TypeIndex(index_dir)
+    return _indexes[index_dir]
@@ -0,0 +1,63 @@
+from rdflib.plugins.sparql import prepareQuery
+
+from src.tools.sparql_guard import find_expensive_patterns
+
+PREFIXES = """
+PREFIX wd: <http://www.wikidata.org/entity/>
+PREFIX wdt: <http://www.wikidata.org/prop/direct/>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+"""
+
+
+def issues(query: str):
+    return find_expensive_patterns(prepareQuery(PREFIXES + query))
+
+
+def test_constant_predicate_passes():
+    assert issues("SELECT ?s ?o WHERE { ?s wdt:P17 ?o }") == []
+
+
+def test_predicate_bound_by_values_passes():
+    assert issues("SELECT ?s ?o WHERE { VALUES ?p { wdt:P17 } ?s ?p ?o }") == []
+
+
+def test_predicate_bound_by_bind_passes():
+    assert issues("SELECT ?s ?o WHERE { BIND(wdt:P17 AS ?p) ?s ?p ?o }") == []
+
+
+def test_free_variable_predicate_is_rejected():
+    assert len(issues("SELECT ?s ?p ?o WHERE { ?s ?p ?o }")) == 1
+
+
+def test_variable_predicate_from_entity_passes():
+    assert issues("SELECT ?p ?o WHERE { wd:Q42 ?p ?o }") == []
+
+
+def test_label_predicate_bound_by_values_is_rejected():
+    found = issues('SELECT ?s WHERE { VALUES ?p { rdfs:label } ?s ?p ?l FILTER(?l = "Berlin"@en) }')
+    assert len(found) == 1 and "label text" in found[0]
+
+
+def test_transitive_path_with_free_ends_is_rejected():
+    assert len(issues("SELECT ?a ?b WHERE { ?a wdt:P279* ?b }")) == 1
+
+
+def test_label_join_with_lang_filter_over_class_is_rejected():
+    found = issues('SELECT ?item ?l WHERE { ?item wdt:P31 wd:Q5 . ?item rdfs:label ?l FILTER(LANG(?l) = "en") }')
+    assert len(found) == 1 and "LANG()" in found[0]
+
+
+def test_label_with_lang_filter_of_known_entity_passes():
+    assert issues('SELECT ?l WHERE { wd:Q42 rdfs:label ?l FILTER(LANG(?l) = "en") }') == []
+    assert issues('SELECT ?l WHERE { wd:Q68061 wdt:P136 ?g . ?g rdfs:label ?l FILTER(LANG(?l) = "en") }') == []
+
+
+def test_cross_product_of_classes_is_rejected():
+    found = issues("SELECT ?x ?y WHERE { ?x wdt:P31 wd:Q5 . ?y wdt:P31 wd:Q515 }")
+    assert found and all("cross product" in issue for issue in found)
+
+
+def test_cross_product_with_known_entity_passes():
+    assert issues("SELECT ?x ?y WHERE { wd:Q42 wdt:P69 ?x . VALUES ?y { wd:Q64 } ?y wdt:P17 ?c }") == []
+    assert issues("SELECT ?x WHERE { ?x wdt:P31 wd:Q5398426 ; wdt:P580 ?start . wd:Q13979 wdt:P580 ?date "
+                  "FILTER(YEAR(?date) = YEAR(?start)) }") == []